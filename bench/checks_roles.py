@@ -0,0 +1,140 @@
+"""Micro-benchmark of the role checks of bot.core.checks
+
+Builds a synthetic guild and members holding hundreds of roles, then times the current predicates against the
+previous list-based implementation (role lists rebuilt and scanned on every invocation).
+
+Usage: python -m bench.checks_roles [--roles 500] [--member-roles 300] [--iterations 20000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+
+import discord
+
+from bot.core import checks
+
+
+def _role(role_id: int, position: int) -> dict:
+    return {
+        "id": str(role_id),
+        "name": f"role-{role_id}",
+        "permissions": "0",
+        "position": position,
+        "color": 0,
+        "hoist": False,
+        "managed": False,
+        "mentionable": False,
+    }
+
+
+def build_member(total_roles: int, member_roles: int) -> discord.Member:
+    client = discord.Client(intents=discord.Intents.none())
+    state = client._connection
+    guild_id = 1
+    roles = [_role(guild_id, 0)] + [_role(1000 + i, i + 1) for i in range(total_roles)]
+    guild = discord.Guild(data={"id": str(guild_id), "name": "bench", "owner_id": "2", "roles": roles}, state=state)
+    data = {
+        "user": {"id": "3", "username": "bench", "discriminator": "0", "avatar": None},
+        "roles": [str(1000 + i) for i in range(0, total_roles, max(total_roles // member_roles, 1))][:member_roles],
+        "joined_at": None,
+        "deaf": False,
+        "mute": False,
+        "flags": 0,
+    }
+    return discord.Member(data=data, guild=guild, state=state)
+
+
+def _legacy_has_any_role(*roles):
+    async def predicate(interaction) -> bool:
+        if not isinstance(interaction.user, discord.Member):
+            return False
+        role_ids = [role if isinstance(role, int) else role.id for role in roles]
+        return any(role.id in role_ids for role in interaction.user.roles)
+
+    return predicate
+
+
+def _legacy_has_all_roles(*roles):
+    async def predicate(interaction) -> bool:
+        if not isinstance(interaction.user, discord.Member):
+            return False
+        member_role_ids = {role.id for role in interaction.user.roles}
+        required_ids = [role if isinstance(role, int) else role.id for role in roles]
+        return all(rid in member_role_ids for rid in required_ids)
+
+    return predicate
+
+
+def _legacy_stacked_permissions():
+    async def predicate(interaction) -> bool:
+        # is_server_admin, is_server_mod and has_permissions each resolved guild_permissions on their own
+        results = []
+        for _ in range(3):
+            perms = interaction.user.guild_permissions
+            results.append(perms.administrator or perms.manage_messages)
+        return any(results)
+
+    return predicate
+
+
+def _stacked_permissions():
+    predicates = [
+        checks.is_server_admin().predicate,
+        checks.is_server_mod().predicate,
+        checks.has_permissions(manage_messages=True).predicate,
+    ]
+
+    async def predicate(interaction) -> bool:
+        results = [await check(interaction) for check in predicates]
+        return any(results)
+
+    return predicate
+
+
+async def _time(predicate, interaction, iterations: int) -> float:
+    start = time.perf_counter()
+    for i in range(iterations):
+        # a new interaction each time, so the per-interaction cache of bot.core.checks never hits
+        interaction.id = i
+        await predicate(interaction)
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+async def run(total_roles: int, member_roles: int, iterations: int) -> None:
+    member = build_member(total_roles, member_roles)
+    interaction = SimpleNamespace(id=0, command=None, user=member, channel_id=10, channel=None, guild=member.guild)
+    # worst case for "any": none of the wanted roles is held, every member role gets scanned
+    missing = tuple(range(50_000, 50_020))
+    held = tuple(member._roles[-20:])
+    checks.set_staff_roles(missing)
+
+    cases = [
+        ("has_any_role (miss)", _legacy_has_any_role(*missing), checks.has_any_role(*missing).predicate),
+        ("has_all_roles (hit)", _legacy_has_all_roles(*held), checks.has_all_roles(*held).predicate),
+        ("is_staff (miss)", _legacy_has_any_role(*missing), checks.is_staff().predicate),
+        ("3 stacked perm checks", _legacy_stacked_permissions(), _stacked_permissions()),
+    ]
+    print(f"guild roles: {total_roles}, member roles: {len(member._roles)}, iterations: {iterations}")
+    for name, legacy, current in cases:
+        assert await legacy(interaction) == await current(interaction)
+        before = await _time(legacy, interaction, iterations)
+        after = await _time(current, interaction, iterations)
+        print(f"{name:22} before {before:8.2f} us   after {after:8.2f} us   x{before / after:6.1f}")
+    print(f"permission cache: {checks.permission_cache_stats()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="bench.checks_roles")
+    parser.add_argument("--roles", type=int, default=500)
+    parser.add_argument("--member-roles", type=int, default=300)
+    parser.add_argument("--iterations", type=int, default=20_000)
+    args = parser.parse_args()
+    asyncio.run(run(args.roles, args.member_roles, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Micro-benchmark of per-invocation config access in feature handlers
+
+Compares the lookups the handlers did on every interaction before typed settings (isinstance check and dict.get on
+the raw section, the baseline, and the per-guild FeatureConfig.for_guild(...).get(...) that replaced it) with the
+validated settings objects of bot.core.settings. Ratios are given against the baseline.
+
+Usage: python -m bench.config_access [--guilds 50] [--iterations 1000000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from bot.core.config import feature_config
+from bot.core.settings import Setting, SettingsSchema
+
+SETTINGS = {
+    "ephemeral_default": Setting(bool, default=False),
+    "max_length": Setting(int, default=2000),
+}
+
+
+def build_config(guilds: int):
+    config = {
+        "enabled_features": ["bench"],
+        "features": {"bench": {"ephemeral_default": True, "max_length": 1500}},
+        "guilds": {str(guild_id): {"features": {"bench": {"ephemeral_default": False}}} for guild_id in range(guilds)},
+    }
+    cfg = feature_config(config, "bench")
+    cfg.bind(SettingsSchema("bench", SETTINGS))
+    return config["features"]["bench"], cfg
+
+
+def _time(access, guild_ids, iterations: int) -> float:
+    count = len(guild_ids)
+    start = time.perf_counter()
+    for i in range(iterations):
+        access(guild_ids[i % count])
+    return (time.perf_counter() - start) / iterations * 1_000_000_000
+
+
+def run(guilds: int, iterations: int) -> None:
+    raw, cfg = build_config(guilds)
+    # half of the interactions come from guilds without an overlay
+    guild_ids = [guild_id * 2 for guild_id in range(guilds)]
+
+    def legacy(guild_id):
+        section = raw if isinstance(raw, dict) else {}
+        return bool(section.get("ephemeral_default", False)), int(section.get("max_length", 2000))
+
+    def overlay_dict(guild_id):
+        section = cfg.for_guild(guild_id)
+        return bool(section.get("ephemeral_default", False)), int(section.get("max_length", 2000))
+
+    def settings(guild_id):
+        current = cfg.settings_for(guild_id)
+        return current.ephemeral_default, current.max_length
+
+    for guild_id in guild_ids:
+        assert overlay_dict(guild_id) == settings(guild_id)
+
+    print(f"guild overlays: {guilds}, iterations: {iterations}, 2 settings read per invocation (best of 3)")
+    cases = (("isinstance + get", legacy), ("for_guild + get", overlay_dict), ("settings_for", settings))
+    results = {name: min(_time(access, guild_ids, iterations) for _ in range(3)) for name, access in cases}
+    baseline = results["isinstance + get"]
+    for name, elapsed in results.items():
+        print(f"{name:18} {elapsed:8.1f} ns/invocation   x{baseline / elapsed:5.2f} vs isinstance + get")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="bench.config_access")
+    parser.add_argument("--guilds", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=1_000_000)
+    args = parser.parse_args()
+    run(args.guilds, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
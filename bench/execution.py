@@ -0,0 +1,56 @@
+"""Micro-benchmark of the execution wrapper of bot.core.execution
+
+Times a handler doing nothing, wrapped by ExecutionGuard.wrap under several `execution` options of the FEATURE
+dict, against the bare handler. Without options the wrapper returns the handler itself, the other rows are the
+per-call cost of a policy: concurrency slot, circuit breaker bookkeeping, timeout.
+
+Usage: python -m bench.execution [--iterations 100000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from bot.core.execution import ExecutionGuard
+
+CASES = {
+    "no policy": None,
+    "empty policy": {},
+    "max_concurrency": {"max_concurrency": 4},
+    "breaker": {"breaker_errors": 5},
+    "timeout": {"timeout": 5.0},
+    "all three": {"max_concurrency": 4, "breaker_errors": 5, "timeout": 5.0},
+}
+
+
+async def _ok():
+    return None
+
+
+async def _time(handler, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await handler()
+    return (time.perf_counter() - start) / iterations
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100_000)
+    args = parser.parse_args()
+
+    guard = ExecutionGuard()
+    await _time(_ok, args.iterations)  # warm-up, the first loop of the process runs slower
+    bare = await _time(_ok, args.iterations)
+    print(f"{'bare handler':<16} {bare * 1e9:8.0f} ns")
+    for name, options in CASES.items():
+        info = {"slug": "bench"} if options is None else {"slug": "bench", "execution": options}
+        wrapped = await _time(guard.wrap(_ok, None, info), args.iterations)
+        print(f"{name:<16} {wrapped * 1e9:8.0f} ns  ({(wrapped - bare) * 1e9:+.0f} ns per call)")
+    guard.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
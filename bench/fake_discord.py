@@ -0,0 +1,179 @@
+"""Offline stand-ins for the Discord side of an interaction
+
+Builds real discord.py objects (Guild, Role, TextChannel, Member, Interaction) from synthetic gateway payloads,
+so the code under test runs unmodified, and replaces the webhook adapter that interactions use for their REST
+calls (responses, followups) with one that answers locally after an optional simulated latency.
+Nothing here opens a connection.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+from typing import Dict, List, Optional
+
+import discord
+from discord.webhook.async_ import async_context
+
+GUILD_ID = 1
+CHANNEL_ID = 10
+OWNER_ID = 2
+BOT_ID = 42
+
+# role ids
+EVERYONE_ROLE = GUILD_ID
+STAFF_ROLE = 100
+MOD_ROLE = 101
+
+_message_ids = itertools.count(1_000_000)
+
+
+def _user(user_id: int, name: str, *, bot: bool = False) -> dict:
+    return {"id": str(user_id), "username": name, "discriminator": "0", "avatar": None, "global_name": None, "bot": bot}
+
+
+def _role(role_id: int, name: str, position: int, permissions: discord.Permissions) -> dict:
+    return {
+        "id": str(role_id),
+        "name": name,
+        "permissions": str(permissions.value),
+        "position": position,
+        "color": 0,
+        "hoist": False,
+        "managed": False,
+        "mentionable": False,
+    }
+
+
+def _message(channel_id: int, author: dict, content: Optional[str] = None) -> dict:
+    return {
+        "id": str(next(_message_ids)),
+        "channel_id": str(channel_id),
+        "author": author,
+        "content": content or "",
+        "timestamp": discord.utils.utcnow().isoformat(),
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+    }
+
+
+class FakeWebhookAdapter:
+    """answers the interaction endpoints of discord.webhook.async_.AsyncWebhookAdapter without any HTTP
+
+    latency is slept before every answer to stand for the REST round trip.
+    """
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.calls: Dict[str, int] = {}
+
+    async def _answer(self, name: str) -> None:
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def create_interaction_response(self, interaction_id: int, token: str, **kwargs) -> dict:
+        await self._answer("create_interaction_response")
+        return {"interaction": {"id": str(interaction_id), "type": 2}}
+
+    async def execute_webhook(self, webhook_id: int, token: str, **kwargs) -> dict:
+        await self._answer("execute_webhook")
+        return _message(CHANNEL_ID, _user(BOT_ID, "bench-bot", bot=True))
+
+    async def edit_original_interaction_response(self, application_id: int, token: str, **kwargs) -> dict:
+        await self._answer("edit_original_interaction_response")
+        return _message(CHANNEL_ID, _user(BOT_ID, "bench-bot", bot=True))
+
+    async def get_original_interaction_response(self, application_id: int, token: str, **kwargs) -> dict:
+        await self._answer("get_original_interaction_response")
+        return _message(CHANNEL_ID, _user(BOT_ID, "bench-bot", bot=True))
+
+    async def delete_original_interaction_response(self, application_id: int, token: str, **kwargs) -> None:
+        await self._answer("delete_original_interaction_response")
+
+    def install(self) -> None:
+        """route the REST calls of every interaction of the current context to this adapter"""
+        async_context.set(self)
+
+
+class FakeGuild:
+    """a guild with @everyone, a staff role, a moderator role and one text channel, cached in the client state"""
+
+    def __init__(self, client: discord.Client) -> None:
+        self.state = client._connection
+        self.state.user = discord.ClientUser(state=self.state, data=_user(BOT_ID, "bench-bot", bot=True))
+        self.state.application_id = BOT_ID
+        everyone = discord.Permissions(send_messages=True, view_channel=True, read_message_history=True)
+        roles = [
+            _role(EVERYONE_ROLE, "@everyone", 0, everyone),
+            _role(STAFF_ROLE, "staff", 2, discord.Permissions.none()),
+            _role(MOD_ROLE, "moderator", 1, discord.Permissions(manage_messages=True, kick_members=True)),
+        ]
+        self.channel_payload = {
+            "id": str(CHANNEL_ID),
+            "type": 0,
+            "guild_id": str(GUILD_ID),
+            "name": "bench",
+            "position": 0,
+            "permission_overwrites": [],
+            "nsfw": False,
+            "parent_id": None,
+        }
+        self.guild = discord.Guild(
+            data={
+                "id": str(GUILD_ID),
+                "name": "bench",
+                "owner_id": str(OWNER_ID),
+                "roles": roles,
+                "channels": [self.channel_payload],
+                "member_count": 3,
+            },
+            state=self.state,
+        )
+        self.state._add_guild(self.guild)
+        self._ids = itertools.count()
+
+    def member_payload(self, user_id: int, role_ids: List[int]) -> dict:
+        """interaction member payload, with the channel permissions Discord computes from the roles"""
+        permissions = 0
+        for role_id in (EVERYONE_ROLE, *role_ids):
+            permissions |= self.guild.get_role(role_id).permissions.value
+        return {
+            "user": _user(user_id, f"user-{user_id}"),
+            "roles": [str(role_id) for role_id in role_ids],
+            "joined_at": None,
+            "deaf": False,
+            "mute": False,
+            "flags": 0,
+            "permissions": str(permissions),
+        }
+
+    def interaction(self, member: dict, name: str, options: Optional[list] = None) -> discord.Interaction:
+        """a slash command interaction as the gateway would deliver it, with a fresh snowflake id"""
+        interaction_id = discord.utils.time_snowflake(discord.utils.utcnow()) + next(self._ids) % (1 << 22)
+        data = {
+            "id": str(interaction_id),
+            "application_id": str(BOT_ID),
+            "type": 2,
+            "token": f"token-{interaction_id}",
+            "version": 1,
+            "guild_id": str(GUILD_ID),
+            "channel_id": str(CHANNEL_ID),
+            "channel": self.channel_payload,
+            "member": member,
+            "app_permissions": str(discord.Permissions.all().value),
+            "attachment_size_limit": 8 * 1024 * 1024,
+            "locale": "fr",
+            "guild_locale": "fr",
+            "entitlements": [],
+            "authorizing_integration_owners": {},
+            "data": {"id": "1", "name": name, "type": 1, "guild_id": str(GUILD_ID), "options": options or []},
+        }
+        return discord.Interaction(data=data, state=self.state)
@@ -0,0 +1,292 @@
+"""Offline end-to-end benchmark of slash command handling
+
+Loads the enabled features into a real BotApp (command wrappers, checks, on_tree_error included), then drives its
+CommandTree with synthetic interactions from bench.fake_discord. Interaction responses and followups are answered
+locally after --latency seconds, command sync goes to a fake REST layer: no network is used.
+
+Each scenario is run at every --concurrency level (that many in-flight interactions) and reports, in microseconds:
+- latency: payload parsing to the end of CommandTree dispatch, the in-process cost of one interaction
+- handler: time spent in the command callback (and the wrappers inside it)
+- dispatch: latency minus handler, i.e. command lookup, option parsing, checks and error handling
+Check evaluation alone is timed separately on fresh interactions (cold permission cache).
+
+Results are printed as JSON. With --baseline, p50 latencies are compared to a previous run and the exit status is 1
+when one of them regressed by more than --max-regression. Logging is disabled while measuring.
+
+Usage: python -m bench.interactions [--requests 2000] [--concurrency 1,16,128] [--latency 0]
+                                    [--scenarios ping,say] [--output results.json]
+                                    [--baseline previous.json] [--max-regression 0.25]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import discord
+from discord import app_commands
+
+from bench.fake_discord import GUILD_ID, MOD_ROLE, STAFF_ROLE, FakeGuild, FakeWebhookAdapter
+from bench.sync_boot import _fake_upsert
+from bot.core import checks
+from bot.core.bot import BotApp
+from bot.core.config import _project_root, load_config
+from bot.core.sync import SyncPlanner
+
+# name -> (command, options, member), members are "member" (no role), "mod" and "staff"
+# bench-error is added to the tree directly, not by a feature, so it has no wrappers and reports no handler time
+SCENARIOS: Dict[str, Tuple[str, list, str]] = {
+    "ping": ("ping", [], "member"),
+    "say": (
+        "say",
+        [{"name": "here", "type": 1, "options": [{"name": "message", "type": 3, "value": "bonjour"}]}],
+        "staff",
+    ),
+    "say_denied": (
+        "say",
+        [{"name": "here", "type": 1, "options": [{"name": "message", "type": 3, "value": "bonjour"}]}],
+        "member",
+    ),
+    "checktest_mod": ("checktest", [{"name": "mod", "type": 1, "options": []}], "mod"),
+    "checktest_info": ("checktest", [{"name": "info", "type": 1, "options": []}], "mod"),
+    "cooldown_rejected": ("checktest", [{"name": "cooldown", "type": 1, "options": []}], "member"),
+    "utils_help": (
+        "utils",
+        [{"name": "help", "type": 1, "options": [{"name": "query", "type": 3, "value": "ping"}]}],
+        "member",
+    ),
+    "version": ("version", [], "member"),
+    "handler_error": ("bench-error", [], "member"),
+}
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    return {
+        "p50_us": round(_percentile(values, 0.50) * 1e6, 1),
+        "p95_us": round(_percentile(values, 0.95) * 1e6, 1),
+        "p99_us": round(_percentile(values, 0.99) * 1e6, 1),
+        "mean_us": round(sum(values) / len(values) * 1e6, 1) if values else 0.0,
+    }
+
+
+class Harness:
+    def __init__(self, latency: float) -> None:
+        self.adapter = FakeWebhookAdapter(latency)
+        self.handler_times: Dict[int, float] = {}
+        self.bot: Optional[BotApp] = None
+        self.guild: Optional[FakeGuild] = None
+        self.members: Dict[str, dict] = {}
+
+    def _timing_wrapper(self, callback, command: app_commands.Command, feature_info: Dict):
+        """outermost command wrapper, records the handler time of each interaction"""
+
+        @functools.wraps(callback)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await callback(*args, **kwargs)
+            finally:
+                self.handler_times[args[-1].id] = time.perf_counter() - start
+
+        return wrapper
+
+    async def setup(self, snapshot: Path) -> None:
+        bot = self.bot = BotApp([GUILD_ID])
+        bot.config = load_config(_project_root() / "config" / "config.toml")
+        bot.config["storage"] = {"path": str(snapshot.with_suffix(".db"))}
+        bot.config["lifecycle"] = {
+            **bot.config.get("lifecycle", {}),
+            "session_path": str(snapshot.with_suffix(".session.json")),
+        }
+        bot.config["usage"] = {"path": str(snapshot.with_suffix(".usage.db"))}
+        bot.sync_planner = SyncPlanner(snapshot)
+        bot.command_wrappers.append(self._timing_wrapper)
+        upsert = _fake_upsert(0.0, [])
+        bot.http.bulk_upsert_global_commands = upsert
+        bot.http.bulk_upsert_guild_commands = upsert
+
+        @bot.tree.command(name="bench-error", description="Always raises")
+        async def bench_error(interaction: discord.Interaction):
+            raise RuntimeError("bench")
+
+        self.guild = FakeGuild(bot)
+        await bot.setup_hook()
+        checks.set_staff_roles([STAFF_ROLE])
+        self.adapter.install()
+        self.members = {
+            "member": self.guild.member_payload(200, []),
+            "mod": self.guild.member_payload(201, [MOD_ROLE]),
+            "staff": self.guild.member_payload(202, [STAFF_ROLE]),
+        }
+
+    async def run_scenario(self, name: str, concurrency: int, requests: int) -> Dict:
+        command, options, member_kind = SCENARIOS[name]
+        member = self.members[member_kind]
+        tree = self.bot.tree
+        latencies: List[float] = []
+        handlers: List[float] = []
+        dispatch: List[float] = []
+        failed = 0
+        remaining = iter(range(requests))
+
+        async def worker() -> None:
+            nonlocal failed
+            for _ in remaining:
+                start = time.perf_counter()
+                interaction = self.guild.interaction(member, command, options)
+                await tree._call(interaction)
+                elapsed = time.perf_counter() - start
+                handler = self.handler_times.pop(interaction.id, 0.0)
+                latencies.append(elapsed)
+                handlers.append(handler)
+                dispatch.append(elapsed - handler)
+                failed += interaction.command_failed
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+        return {
+            "requests": requests,
+            "failed": failed,
+            "throughput_per_s": round(requests / wall, 1),
+            "latency": _summary(latencies),
+            "handler": _summary(handlers),
+            "dispatch": _summary(dispatch),
+        }
+
+    async def time_checks(self, name: str, requests: int) -> Optional[Dict]:
+        command_name, options, member_kind = SCENARIOS[name]
+        member = self.members[member_kind]
+        probe = self.guild.interaction(member, command_name, options)
+        command, _ = self.bot.tree._get_app_command_options(probe.data)
+        if not command.checks:
+            return None
+        timings = []
+        for _ in range(requests):
+            interaction = self.guild.interaction(member, command_name, options)
+            start = time.perf_counter()
+            try:
+                await command._check_can_run(interaction)
+            except app_commands.AppCommandError:
+                pass
+            timings.append(time.perf_counter() - start)
+        return {"checks": len(command.checks), **_summary(timings)}
+
+
+def compare(baseline: Dict, current: Dict, max_regression: float) -> List[str]:
+    """p50 latencies of current that are more than max_regression slower than in baseline"""
+    regressions = []
+    for name, levels in current["scenarios"].items():
+        for level, result in levels.items():
+            before = baseline.get("scenarios", {}).get(name, {}).get(level)
+            if before is None or not before["latency"]["p50_us"]:
+                continue
+            ratio = result["latency"]["p50_us"] / before["latency"]["p50_us"]
+            if ratio > 1 + max_regression:
+                regressions.append(
+                    f"{name} @ concurrency {level}: p50 {before['latency']['p50_us']} -> "
+                    f"{result['latency']['p50_us']} us (+{(ratio - 1) * 100:.0f}%)"
+                )
+    for name, result in current["checks"].items():
+        before = baseline.get("checks", {}).get(name)
+        if before is None or not before["p50_us"]:
+            continue
+        ratio = result["p50_us"] / before["p50_us"]
+        if ratio > 1 + max_regression:
+            regressions.append(
+                f"{name} checks: p50 {before['p50_us']} -> {result['p50_us']} us (+{(ratio - 1) * 100:.0f}%)"
+            )
+    return regressions
+
+
+async def run(scenarios: List[str], levels: List[int], requests: int, latency: float) -> Dict:
+    harness = Harness(latency)
+    tmp = tempfile.TemporaryDirectory()
+    await harness.setup(Path(tmp.name) / "sync.json")
+    logging.disable(logging.CRITICAL)
+    try:
+        # warm up imports, caches and code paths once per scenario
+        for name in scenarios:
+            await harness.run_scenario(name, 1, 50)
+        results: Dict = {"scenarios": {}, "checks": {}}
+        for name in scenarios:
+            results["scenarios"][name] = {
+                str(level): await harness.run_scenario(name, level, requests) for level in levels
+            }
+            checks_result = await harness.time_checks(name, requests)
+            if checks_result is not None:
+                results["checks"][name] = checks_result
+    finally:
+        logging.disable(logging.NOTSET)
+        await harness.bot.close()
+        tmp.cleanup()
+    results["meta"] = {
+        "python": platform.python_version(),
+        "discord.py": discord.__version__,
+        "requests": requests,
+        "concurrency": levels,
+        "response_latency_s": latency,
+        "rest_calls": harness.adapter.calls,
+    }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="bench.interactions")
+    parser.add_argument("--requests", type=int, default=2000, help="interactions per scenario and concurrency level")
+    parser.add_argument("--concurrency", default="1,16,128", help="comma separated in-flight interaction counts")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated seconds per interaction REST call")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma separated scenario names")
+    parser.add_argument("--output", type=Path, help="write the JSON results to this file instead of stdout")
+    parser.add_argument("--baseline", type=Path, help="JSON results of a previous run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="allowed p50 slowdown, 0.25 = 25%%")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)} (available: {', '.join(SCENARIOS)})")
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+
+    results = asyncio.run(run(scenarios, levels, args.requests, args.latency))
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+    for name, levels_results in results["scenarios"].items():
+        for level, result in levels_results.items():
+            print(
+                f"{name:18} c={level:>4}  p50 {result['latency']['p50_us']:8.1f} us  "
+                f"dispatch {result['dispatch']['p50_us']:8.1f} us  {result['throughput_per_s']:10.1f}/s",
+                file=sys.stderr,
+            )
+
+    if args.baseline:
+        regressions = compare(json.loads(args.baseline.read_text(encoding="utf-8")), results, args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"no regression above {args.max_regression * 100:.0f}% against {args.baseline}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
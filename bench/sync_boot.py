@@ -0,0 +1,82 @@
+"""Cold-boot benchmark for the command sync planner
+
+Runs BotApp.setup_hook offline against a fake Discord REST layer that costs SYNC_LATENCY per
+bulk upsert, once with a changed command set and once with an unchanged one.
+
+Usage: python -m bench.sync_boot [--latency 0.35] [--runs 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from bot.core.bot import BotApp
+from bot.core.config import _project_root, load_config
+from bot.core.sync import SyncPlanner
+
+
+def _fake_upsert(latency: float, calls: list):
+    async def upsert(application_id, *args, payload):
+        calls.append(len(payload))
+        await asyncio.sleep(latency)
+        return [
+            {**data, "id": str(index + 1), "application_id": str(application_id), "version": "1"}
+            for index, data in enumerate(payload)
+        ]
+
+    return upsert
+
+
+async def _boot(snapshot: Path, latency: float, *, force: bool = False) -> tuple[float, int]:
+    bot = BotApp([1], force_sync=force)
+    bot.config = load_config(_project_root() / "config" / "config.toml")
+    bot.config["storage"] = {"path": str(snapshot.with_suffix(".db"))}
+    bot.config["usage"] = {"path": str(snapshot.with_suffix(".usage.db"))}
+    bot.config["lifecycle"] = {
+        **bot.config.get("lifecycle", {}),
+        "session_path": str(snapshot.with_suffix(".session.json")),
+    }
+    bot.sync_planner = SyncPlanner(snapshot, force=force)
+    bot._connection.application_id = 42
+    calls: list = []
+    upsert = _fake_upsert(latency, calls)
+    bot.http.bulk_upsert_global_commands = upsert
+    bot.http.bulk_upsert_guild_commands = upsert
+    start = time.perf_counter()
+    await bot.setup_hook()
+    elapsed = time.perf_counter() - start
+    await bot.close()
+    return elapsed, len(calls)
+
+
+async def run(latency: float, runs: int) -> None:
+    changed, unchanged = [], []
+    calls_changed = calls_unchanged = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(runs):
+            snapshot = Path(tmp) / f"snapshot_{i}.json"
+            elapsed, calls_changed = await _boot(snapshot, latency)
+            changed.append(elapsed)
+            elapsed, calls_unchanged = await _boot(snapshot, latency)
+            unchanged.append(elapsed)
+
+    print(f"sync latency per REST call: {latency * 1000:.0f} ms, runs: {runs}")
+    print(f"changed commands   : {statistics.median(changed) * 1000:8.1f} ms median ({calls_changed} sync calls)")
+    print(f"unchanged commands : {statistics.median(unchanged) * 1000:8.1f} ms median ({calls_unchanged} sync calls)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="bench.sync_boot")
+    parser.add_argument("--latency", type=float, default=0.35, help="simulated seconds per bulk upsert")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.latency, args.runs))
+
+
+if __name__ == "__main__":
+    main()
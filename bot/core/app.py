@@ -1,110 +1,77 @@
 from __future__ import annotations
 
+import argparse
 import logging
 import os
-import sys
-from datetime import date
-from logging.handlers import RotatingFileHandler
-from pathlib import Path
+import time
 
-import discord
-from discord import app_commands
-from discord.ext import commands
-from dotenv import load_dotenv
-
-from ..core.checks import set_staff_roles
 from ..core.config import load_config, load_env
-from ..core.loader import load_features
-
-
-def setup_logging(level: str = "INFO") -> None:
-    logs_dir = Path(__file__).resolve().parent.parent.parent / "logs"
-    logs_dir.mkdir(exist_ok=True)
-
-    fmt = logging.Formatter("%(asctime)s | %(levelname)s | %(name)s | %(message)s")
+from ..core.logs import setup_logging, stop_logging
+from ..core.startup import StartupProfile
 
-    root = logging.getLogger()
-    root.setLevel(getattr(logging, level.upper(), logging.INFO))
-    root.handlers.clear()
+# as close to the start of the process as the bot gets, uptime falls back to it where /proc is not available
+STARTED_AT = time.time()
 
-    # Redirect stderr to stdout to fix Railway logging issues
-    sys.stderr = sys.stdout
 
-    sh = logging.StreamHandler(sys.stdout)
-    sh.setFormatter(fmt)
-    root.addHandler(sh)
-
-    fh = RotatingFileHandler(
-        logs_dir / f"bot_{date.today().isoformat()}.log",
-        maxBytes=5_000_000,
-        encoding="utf-8",
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="bot.core.app")
+    parser.add_argument(
+        "--force-sync", action="store_true", help="sync commands to Discord even if they did not change"
     )
-    fh.setFormatter(fmt)
-    root.addHandler(fh)
-
-
-class BotApp(commands.Bot):
-    def __init__(self, guild_id: int) -> None:
-        intents = discord.Intents.default()
-        super().__init__(command_prefix="!", intents=intents)
-        self.guild = discord.Object(id=guild_id)
-
-    async def setup_hook(self) -> None:
-        self.tree.on_error = self.on_tree_error
-        self.tree.clear_commands(guild=None)
-        await self.tree.sync()
-
-        loaded, failed = load_features(self.tree, self.config)
-        logging.getLogger(__name__).info(f"Loaded features: {list(loaded.keys())}")
-        if failed:
-            logging.getLogger(__name__).warning(f"Failed to load features: {failed}")
-
-        self.tree.copy_global_to(guild=self.guild)
-        synced = await self.tree.sync(guild=self.guild)
-        logging.getLogger(__name__).info("Synced %d commands to guild %s", len(synced), self.guild.id)
-
-    async def on_tree_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError) -> None:
-
-        if isinstance(error, app_commands.CommandOnCooldown):
-            logging.getLogger(__name__).warning(f"Command on cooldown {interaction.command}: {error}")
-            await interaction.response.send_message(
-                f"⏳ Cette commande est en cooldown. Réessaie dans {error.retry_after:.1f} secondes.",
-                ephemeral=True,
-            )
-            return
-
-        if isinstance(error, app_commands.MissingPermissions):
-            logging.getLogger(__name__).warning(f"Missing permissions for command {interaction.command}: {error}")
-            await interaction.response.send_message(
-                "❌ Tu n'as pas les permissions nécessaires pour utiliser cette commande.", ephemeral=True
-            )
-            return
-
-        if isinstance(error, app_commands.CheckFailure):
-            logging.getLogger(__name__).warning(f"Check failed for command {interaction.command}: {error}")
-            await interaction.response.send_message(
-                "❌ Tu ne remplis pas les conditions pour utiliser cette commande.", ephemeral=True
-            )
-            return
-
-        logging.getLogger(__name__).error(f"Error in command {interaction.command}: {error}")
-        await interaction.response.send_message(
-            "❌ Une erreur est survenue lors de l'exécution de la commande.", ephemeral=True
-        )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="print the duration of each startup phase once the gateway is ready, then exit",
+    )
+    return parser.parse_args(argv)
 
 
-def main() -> None:
-    setup_logging(level=os.getenv("LOG_LEVEL", "INFO"))
-    load_dotenv()
+def main(argv: list[str] | None = None) -> None:
+    args = _parse_args(argv)
+    startup = StartupProfile()
+    setup_logging(level=os.getenv("LOG_LEVEL", "INFO"), fmt=os.getenv("LOG_FORMAT", "text"))
     env = load_env()
-    set_staff_roles(env.staff_roles_ids)
+    startup.mark("env")
 
     config = load_config(env.config_path)
+    startup.mark("config")
 
-    bot = BotApp(guild_id=env.guild_id)
-    bot.config = config
+    # discord.py (and aiohttp) make up most of the import time, only pay it once env and config are valid
+    from ..core.bot import BotApp, ShardedBotApp
+    from ..core.checks import set_staff_roles
+    from ..core.cooldown import backend_from_config, set_cooldown_backend
+    from ..core.intents import gateway_policy
+
+    startup.mark("core imports")
 
-    bot.run(env.discord_token, log_handler=None)
+    set_staff_roles(env.staff_roles_ids)
+    set_cooldown_backend(backend_from_config(config.get("cooldown", {})))
+
+    policy = gateway_policy(config)
+    logging.getLogger(__name__).info("Gateway policy:\n%s", policy.report())
+
+    if env.shard_count is None:
+        bot = BotApp(env.guild_ids, force_sync=args.force_sync, **policy.options())
+    else:
+        bot = ShardedBotApp(
+            env.guild_ids,
+            force_sync=args.force_sync,
+            shard_count=None if env.shard_count == "auto" else env.shard_count,
+            shard_ids=env.shard_ids,
+            **policy.options(),
+        )
+    bot.config = config
+    bot.config_path = env.config_path
+    bot.startup = startup
+    bot.started_at = STARTED_AT
+    bot.profile_startup = args.profile_startup
+    bot.handle_signals = True
+    startup.mark("client")
+
+    try:
+        bot.run(env.discord_token, log_handler=None)
+    finally:
+        stop_logging()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple, Union
+
+import discord
+from discord import app_commands
+
+log = logging.getLogger(__name__)
+
+# features attach a suggestion source to a str parameter:
+#   from bot.core.autocomplete import channels, roles, source, static, suggest
+#   @app_commands.autocomplete(template=suggest(static(["annonce", "rappel", "bienvenue"])))
+#   @app_commands.autocomplete(role_id=suggest(roles()))                 -> role names, the value is the role id
+#   @app_commands.autocomplete(channel_id=suggest(channels(discord.ChannelType.text)))
+#   @app_commands.autocomplete(item=suggest(source(fetch_items, ttl=60)))  -> async def fetch_items(interaction)
+# candidates are strings, (name, value) pairs or app_commands.Choice. Sources are read once per guild and TTL,
+# rankings once per (guild, typed text): typing never calls the API more than once per TTL.
+
+MAX_CHOICES = 25  # Discord limit
+MAX_LENGTH = 100  # Discord limit for choice names and string values
+DEADLINE = 2.0  # seconds left to a source, Discord drops autocomplete answers after 3
+
+
+@dataclass(frozen=True)
+class Candidate:
+    name: str
+    value: str
+    key: str  # casefolded name, what the typed text is matched against
+
+    @classmethod
+    def of(cls, item: Union[str, Tuple[str, Any], app_commands.Choice]) -> "Candidate":
+        if isinstance(item, app_commands.Choice):
+            name, value = item.name, item.value
+        elif isinstance(item, tuple):
+            name, value = item
+        else:
+            name = value = item
+        name = str(name)[:MAX_LENGTH]
+        return cls(name, str(value)[:MAX_LENGTH], name.casefold())
+
+
+class TTLCache:
+    """mapping whose entries expire `ttl` seconds after being stored, the least recently used evicted past max_entries"""
+
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# --- ranking ---
+
+
+def _score(key: str, query: str) -> Optional[Tuple[int, int]]:
+    """(tier, penalty) of a candidate for the typed text, lower is better, None if it does not match
+
+    tiers: exact, prefix, prefix of a later word, substring, letters in order (penalty: letters skipped)
+    """
+    if key == query:
+        return 0, 0
+    if key.startswith(query):
+        return 1, 0
+    position = key.find(query)
+    if position > 0:
+        return (2, position) if not key[position - 1].isalnum() else (3, position)
+    # fuzzy: every letter of query in order
+    position, skipped = -1, 0
+    for char in query:
+        found = key.find(char, position + 1)
+        if found < 0:
+            return None
+        skipped += found - position - 1
+        position = found
+    return 4, skipped
+
+
+def rank(candidates: Sequence[Candidate], query: str, limit: int = MAX_CHOICES) -> List[Candidate]:
+    """the `limit` best matches for query, in candidate order when nothing is typed"""
+    query = query.strip().casefold()
+    if not query:
+        return list(candidates[:limit])
+    scored = []
+    for index, candidate in enumerate(candidates):
+        score = _score(candidate.key, query)
+        if score is not None:
+            scored.append((score[0], score[1], len(candidate.key), index))
+    return [candidates[entry[3]] for entry in heapq.nsmallest(limit, scored)]
+
+
+# --- sources ---
+
+
+class Source(ABC):
+    """where suggestions come from, read at most once per cache key and ttl"""
+
+    ttl = 30.0
+
+    def __repr__(self) -> str:
+        return type(self).__name__
+
+    def cache_key(self, interaction: discord.Interaction) -> Hashable:
+        return interaction.guild_id
+
+    @abstractmethod
+    async def fetch(self, interaction: discord.Interaction) -> Iterable:
+        """the candidates for this interaction, strings, (name, value) pairs or app_commands.Choice"""
+
+
+class StaticSource(Source):
+    def __init__(self, items: Iterable) -> None:
+        self.items = [Candidate.of(item) for item in items]
+
+    def cache_key(self, interaction: discord.Interaction) -> Hashable:
+        return None
+
+    async def fetch(self, interaction: discord.Interaction) -> Iterable:
+        return self.items
+
+
+class RoleSource(Source):
+    ttl = 10.0
+
+    def __init__(self, *, include_managed: bool = False) -> None:
+        self.include_managed = include_managed
+
+    async def fetch(self, interaction: discord.Interaction) -> Iterable:
+        guild = interaction.guild
+        if guild is None:
+            return []
+        # highest roles first, like in the member list; no API call, the cache is kept up to date by the gateway
+        return [
+            (role.name, role.id)
+            for role in reversed(guild.roles)
+            if not role.is_default() and (self.include_managed or not role.managed)
+        ]
+
+
+class ChannelSource(Source):
+    ttl = 10.0
+
+    def __init__(self, types: Sequence[discord.ChannelType]) -> None:
+        self.types = set(types)
+
+    async def fetch(self, interaction: discord.Interaction) -> Iterable:
+        guild = interaction.guild
+        if guild is None:
+            return []
+        return [
+            (f"#{channel.name}", channel.id)
+            for channel in sorted(guild.channels, key=lambda channel: (channel.position, channel.id))
+            if not self.types or channel.type in self.types
+        ]
+
+
+class CallableSource(Source):
+    def __init__(
+        self,
+        fn: Callable[[discord.Interaction], Awaitable[Iterable]],
+        *,
+        ttl: float = 30.0,
+        key: Optional[Callable[[discord.Interaction], Hashable]] = None,
+    ) -> None:
+        self.fn = fn
+        self.ttl = ttl
+        self.key = key
+
+    def __repr__(self) -> str:
+        return getattr(self.fn, "__qualname__", repr(self.fn))
+
+    def cache_key(self, interaction: discord.Interaction) -> Hashable:
+        return self.key(interaction) if self.key is not None else interaction.guild_id
+
+    async def fetch(self, interaction: discord.Interaction) -> Iterable:
+        return await self.fn(interaction)
+
+
+def static(items: Iterable) -> StaticSource:
+    return StaticSource(items)
+
+
+def roles(*, include_managed: bool = False) -> RoleSource:
+    """the roles of the guild, from the cache, @everyone excluded"""
+    return RoleSource(include_managed=include_managed)
+
+
+def channels(*types: discord.ChannelType) -> ChannelSource:
+    """the channels of the guild of the given types (all by default), from the cache"""
+    return ChannelSource(types)
+
+
+def source(
+    fn: Callable[[discord.Interaction], Awaitable[Iterable]],
+    *,
+    ttl: float = 30.0,
+    key: Optional[Callable[[discord.Interaction], Hashable]] = None,
+) -> CallableSource:
+    """suggestions returned by `await fn(interaction)`, cached per key(interaction) (the guild by default)"""
+    return CallableSource(fn, ttl=ttl, key=key)
+
+
+# --- the autocomplete callback ---
+
+
+class Suggester:
+    """memoizes a source: its candidates per cache key, the rankings of those per (cache key, typed text)
+
+    Concurrent keystrokes waiting for the same candidates share one fetch. A fetch slower than `deadline` answers
+    nothing this time and keeps running in the background, so the next keystroke is served from the cache.
+    """
+
+    def __init__(self, source: Source, *, max_entries: int = 1024, deadline: float = DEADLINE) -> None:
+        self.source = source
+        self.deadline = deadline
+        self._candidates = TTLCache(source.ttl, max_entries)
+        self._rankings = TTLCache(source.ttl, max_entries)
+        self._fetching: Dict[Hashable, asyncio.Future] = {}
+
+    async def _fetch(self, key: Hashable, interaction: discord.Interaction) -> List[Candidate]:
+        start = time.perf_counter()
+        try:
+            candidates = [
+                item if isinstance(item, Candidate) else Candidate.of(item)
+                for item in await self.source.fetch(interaction)
+            ]
+        finally:
+            del self._fetching[key]
+        elapsed = time.perf_counter() - start
+        if elapsed > self.deadline:
+            log.warning("Autocomplete source %s took %.1f s, past the %.1f s deadline", self.source, elapsed, self.deadline)
+        self._candidates.put(key, candidates)
+        return candidates
+
+    async def candidates(self, interaction: discord.Interaction) -> List[Candidate]:
+        key = self.source.cache_key(interaction)
+        candidates = self._candidates.get(key)
+        if candidates is not None:
+            return candidates
+        future = self._fetching.get(key)
+        if future is None:
+            future = self._fetching[key] = asyncio.ensure_future(self._fetch(key, interaction))
+            future.add_done_callback(_log_failure)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.deadline)
+        except asyncio.TimeoutError:
+            # answered empty, the next keystroke gets the candidates once the fetch is done
+            return []
+
+    async def complete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        """the autocomplete callback, given to app_commands.autocomplete"""
+        try:
+            candidates = await self.candidates(interaction)
+        except Exception as e:
+            log.error("Autocomplete source %s failed: %s", self.source, e)
+            return []
+        key = (self.source.cache_key(interaction), current.strip().casefold())
+        cached = self._rankings.get(key)
+        # a ranking is only reused while the candidates it was computed from are current
+        if cached is not None and cached[0] is candidates:
+            return cached[1]
+        ranked = [app_commands.Choice(name=c.name, value=c.value) for c in rank(candidates, current)]
+        if candidates:
+            self._rankings.put(key, (candidates, ranked))
+        return ranked
+
+
+def _log_failure(future: asyncio.Future) -> None:
+    # retrieved here so that a failed background fetch nobody waits for anymore is not reported as never retrieved
+    if not future.cancelled():
+        future.exception()
+
+
+def suggest(source: Source, *, max_entries: int = 1024, deadline: float = DEADLINE):
+    """autocomplete callback for app_commands.autocomplete serving suggestions from source"""
+    return Suggester(source, max_entries=max_entries, deadline=deadline).complete
@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Sequence
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from ..core.cooldown import get_cooldown_backend
+from ..core.defer import auto_defer
+from ..core.diagnostics import DiagnosticsCollector, collector_from_config
+from ..core.execution import ExecutionGuard, FeatureUnavailable, HandlerTimeout, guard_from_config
+from ..core.lifecycle import Lifecycle, lifecycle_from_config
+from ..core.loader import load_features
+from ..core.metrics import MetricsRegistry, MetricsServer, register_stats_command
+from ..core.outbound import OutboundDispatcher, dispatcher_from_config
+from ..core.reload import FeatureReloader, register_reload_command
+from ..core.startup import StartupProfile
+from ..core.storage import Store, store_from_config
+from ..core.sync import SyncPlanner
+from ..core.usage import REFUSED, UsageRecorder, recorder_from_config, register_usage_command
+from ..core.watchdog import LoopWatchdog, watchdog_from_config
+
+
+class BotApp(commands.Bot):
+    def __init__(
+        self,
+        guild_ids: Sequence[int],
+        *,
+        force_sync: bool = False,
+        intents: discord.Intents | None = None,
+        **options,
+    ) -> None:
+        intents = intents or discord.Intents.default()
+        super().__init__(command_prefix="!", intents=intents, **options)
+        self.guild_scopes = [discord.Object(id=guild_id) for guild_id in guild_ids]
+        self.sync_planner = SyncPlanner(force=force_sync)
+        self.config_path: Path | None = None
+        self.reloader: FeatureReloader | None = None
+        self.command_revision = 0
+        self.metrics = MetricsRegistry()
+        self.metrics_server: MetricsServer | None = None
+        self.store: Store | None = None
+        self.outbound: OutboundDispatcher | None = None
+        self.lifecycle: Lifecycle | None = None
+        self.execution: ExecutionGuard | None = None
+        self.watchdog: LoopWatchdog | None = None
+        self.diagnostics: DiagnosticsCollector | None = None
+        self.usage: UsageRecorder | None = None
+        # set by main: SIGTERM / SIGINT drain the running commands before closing
+        self.handle_signals = False
+        # set by main, closed phase by phase until the first on_ready
+        self.startup: StartupProfile | None = None
+        self.profile_startup = False
+        # set by main, time.time() when bot.core.app was imported: uptime where /proc is not available
+        self.started_at: float | None = None
+        # innermost first
+        self.command_wrappers = [auto_defer, self.metrics.instrument]
+
+    @property
+    def sync_scopes(self) -> list[discord.abc.Snowflake | None]:
+        """scopes synced with Discord, None being the (empty) global scope"""
+        return [None, *self.guild_scopes]
+
+    @property
+    def syncs_commands(self) -> bool:
+        """only one process of a sharded deployment (the one running shard 0) talks to the command endpoints"""
+        shard_ids = getattr(self, "shard_ids", None)
+        return not shard_ids or 0 in shard_ids
+
+    def publish_commands(self) -> None:
+        """copy the commands registered globally by features to every guild scope"""
+        # commands only live in the guild scopes, the global scope is kept empty on Discord
+        for guild in self.guild_scopes:
+            self.tree.copy_global_to(guild=guild)
+        self.tree.clear_commands(guild=None)
+
+    async def setup_hook(self) -> None:
+        if self.startup is not None:
+            self.startup.mark("login")
+        self.tree.on_error = self.on_tree_error
+
+        self.watchdog = watchdog_from_config(self.config.get("watchdog", {}))
+        if self.watchdog is not None:
+            self.watchdog.register_metrics(self.metrics)
+            self.watchdog.start()
+
+        self.execution = guard_from_config(self.config.get("execution", {}))
+        self.execution.register_metrics(self.metrics)
+        # innermost, so auto_defer also covers the wait for a concurrency slot
+        self.command_wrappers.insert(0, self.execution.wrap)
+
+        self.usage = recorder_from_config(self.config.get("usage", {}))
+        if self.usage is not None:
+            await self.usage.start()
+            self.command_wrappers.append(self.usage.instrument)
+            register_usage_command(self.tree, self.usage)
+
+        self.lifecycle = lifecycle_from_config(self, self.config.get("lifecycle", {}))
+        self.tree.interaction_check = self.lifecycle.interaction_check
+        # outermost, the handler counts as running until every other wrapper is done
+        self.command_wrappers.append(self.lifecycle.track)
+        self.lifecycle.load_session()
+        if self.handle_signals:
+            self.lifecycle.install_signal_handlers()
+
+        if self.config_path is not None:
+            reload_config = self.config.get("reload", {})
+            self.reloader = FeatureReloader(self, self.config_path, interval=reload_config.get("interval", 2.0))
+            register_reload_command(self.tree, self.reloader)
+        register_stats_command(self.tree, self.metrics)
+
+        self.outbound = dispatcher_from_config(self.config.get("outbound", {}))
+        self.outbound.register_metrics(self.metrics)
+        self.outbound.start()
+
+        self.store = store_from_config(self.config.get("storage", {}))
+        await self.store.start()
+        if self.startup is not None:
+            self.startup.mark("storage")
+
+        loaded, failed, reports = load_features(
+            self.tree, self.config, wrappers=self.command_wrappers, store=self.store
+        )
+        if self.startup is not None:
+            self.startup.mark("feature imports", register=sum(report.register_time for report in reports.values()))
+        self.features = loaded
+        self.feature_reports = reports
+        logging.getLogger(__name__).info("Loaded features: %s", list(loaded.keys()))
+        if failed:
+            logging.getLogger(__name__).warning("Failed to load features: %s", failed)
+
+        self.diagnostics = collector_from_config(self, self.config.get("diagnostics", {}))
+        self.diagnostics.start()
+
+        self.publish_commands()
+
+        synced = await self.sync_planner.sync(self.tree, self.sync_scopes) if self.syncs_commands else {}
+        self.command_revision += 1
+        if self.startup is not None:
+            self.startup.mark("sync")
+        if synced:
+            logging.getLogger(__name__).info("Synced commands: %s", synced)
+        else:
+            logging.getLogger(__name__).info("Commands unchanged since last sync, skipping sync")
+
+        if self.reloader is not None and self.config.get("reload", {}).get("watch", False):
+            self.reloader.start()
+
+        metrics_config = self.config.get("metrics", {})
+        if metrics_config.get("enabled", False):
+            self.metrics_server = MetricsServer(
+                self.metrics, metrics_config.get("host", "127.0.0.1"), metrics_config.get("port", 9108)
+            )
+            await self.metrics_server.start()
+
+    async def connect(self, *, reconnect: bool = True) -> None:
+        if self.lifecycle is None:
+            return await super().connect(reconnect=reconnect)
+        await self.lifecycle.connect(super().connect, reconnect=reconnect)
+
+    async def shutdown(self, reason: str = "requested") -> None:
+        """drain the running commands, flush, save the gateway session and close"""
+        if self.lifecycle is None:
+            return await self.close()
+        await self.lifecycle.request_shutdown(reason)
+
+    async def on_ready(self) -> None:
+        await self._end_startup("gateway ready", "identify")
+
+    async def on_resumed(self) -> None:
+        # resuming the previous process' session: no READY, the guilds are fetched instead
+        if self.is_ready():
+            return
+        await self.lifecycle.rehydrate()
+        await self._end_startup("gateway resumed", "resume")
+
+    async def _end_startup(self, phase: str, how: str) -> None:
+        # on_ready and on_resumed fire again after reconnections, only the first one ends the startup
+        if self.startup is None:
+            return
+        startup, self.startup = self.startup, None
+        startup.mark(phase)
+        if self.lifecycle is not None:
+            self.lifecycle.report_restart(how)
+        logging.getLogger(__name__).info("Ready in %.2f s", startup.total)
+        logging.getLogger(__name__).debug("Startup phases:\n%s", startup.report())
+        if self.profile_startup:
+            print(startup.report(), flush=True)
+            await self.close()
+
+    async def close(self) -> None:
+        if self.watchdog is not None:
+            await self.watchdog.close()
+        if self.diagnostics is not None:
+            await self.diagnostics.close()
+        if self.usage is not None:
+            await self.usage.close()
+        if self.metrics_server is not None:
+            await self.metrics_server.close()
+        if self.outbound is not None:
+            await self.outbound.close()
+        if self.store is not None:
+            await self.store.close()
+        await get_cooldown_backend().close()
+        if self.execution is not None:
+            self.execution.close()
+        await super().close()
+
+    async def _send_error(self, interaction: discord.Interaction, message: str) -> None:
+        """answer with an ephemeral error, as a followup if the interaction was already responded to or deferred"""
+        try:
+            if interaction.response.is_done():
+                await interaction.followup.send(message, ephemeral=True)
+            else:
+                await interaction.response.send_message(message, ephemeral=True)
+        except discord.HTTPException as e:
+            logging.getLogger(__name__).error("Failed to send error message for %s: %s", interaction.command, e)
+
+    async def on_tree_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError) -> None:
+        if isinstance(error, app_commands.CheckFailure):
+            self.metrics.record_check_failure(interaction)
+            if self.usage is not None and interaction.command is not None:
+                self.usage.record(interaction, REFUSED)
+
+        if isinstance(error, app_commands.CommandOnCooldown):
+            logging.getLogger(__name__).warning("Command on cooldown %s: %s", interaction.command, error)
+            await self._send_error(
+                interaction, f"⏳ Cette commande est en cooldown. Réessaie dans {error.retry_after:.1f} secondes."
+            )
+            return
+
+        if isinstance(error, FeatureUnavailable):
+            logging.getLogger(__name__).warning("Command %s refused: %s", interaction.command, error)
+            await self._send_error(
+                interaction,
+                f"🚧 Cette fonctionnalité est temporairement indisponible. Réessaie dans {error.retry_after:.0f} secondes.",
+            )
+            return
+
+        if isinstance(error, HandlerTimeout):
+            logging.getLogger(__name__).error("Command %s timed out: %s", interaction.command, error)
+            await self._send_error(interaction, "⏱️ La commande a pris trop de temps et a été interrompue.")
+            return
+
+        if isinstance(error, app_commands.MissingPermissions):
+            logging.getLogger(__name__).warning("Missing permissions for command %s: %s", interaction.command, error)
+            await self._send_error(interaction, "❌ Tu n'as pas les permissions nécessaires pour utiliser cette commande.")
+            return
+
+        if isinstance(error, app_commands.CheckFailure):
+            logging.getLogger(__name__).warning("Check failed for command %s: %s", interaction.command, error)
+            await self._send_error(interaction, "❌ Tu ne remplis pas les conditions pour utiliser cette commande.")
+            return
+
+        logging.getLogger(__name__).error("Error in command %s: %s", interaction.command, error)
+        await self._send_error(interaction, "❌ Une erreur est survenue lors de l'exécution de la commande.")
+
+
+class ShardedBotApp(BotApp, commands.AutoShardedBot):
+    """BotApp running several gateway shards in one process (SHARD_COUNT / SHARD_IDS)"""
@@ -1,20 +1,39 @@
 from __future__ import annotations
 
-from typing import Callable, List, Union
-from functools import wraps
+import time
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, FrozenSet, Iterable, List, Tuple, Union
 
 import discord
 from discord import app_commands
+from discord.utils import maybe_coroutine
+
+from ..core import cooldown as _cooldown
 
 # global check decorators for features
 # import with: from bot.core.checks import is_staff, is_server_admin, ...
 
-_staff_roles_ids: List[int] = []
+_staff_roles_ids: FrozenSet[int] = frozenset()
+
+# relative cost of each predicate, used by all_of/any_of to evaluate the cheapest checks first
+COST_ATTRIBUTE = 0  # plain attribute comparison
+COST_ROLES = 1  # lookup in the member role ids
+COST_GUILD_PERMISSIONS = 2  # resolve member.guild_permissions over all roles
+COST_CHANNEL_PERMISSIONS = 3  # resolve permissions_for over roles and channel overwrites
+COST_COOLDOWN = 4  # consumes a token, must run after every other check
+
+# per-interaction cache shared by every predicate of a check chain
+_CONTEXT_TTL = 30.0  # seconds, checks of an interaction all run within the same dispatch
+_CONTEXT_MAX = 1024
+_contexts: "OrderedDict[int, Tuple[float, Dict[str, object]]]" = OrderedDict()
+_cache_hits: Counter = Counter()
+_cache_misses: Counter = Counter()
 
-def set_staff_roles(roles_ids: List[int]) -> None:
+
+def set_staff_roles(roles_ids: Iterable[int]) -> None:
     """set staff roles ids from env config"""
     global _staff_roles_ids
-    _staff_roles_ids = roles_ids
+    _staff_roles_ids = frozenset(roles_ids)
 
 def _extract_id(obj: Union[int, discord.Role, discord.Member, discord.User, discord.abc.Snowflake]) -> int:
     """extract id from discord obj or return int directly"""
@@ -22,13 +41,71 @@ def _extract_id(obj: Union[int, discord.Role, discord.Member, discord.User, disc
         return obj
     return obj.id
 
-def _extract_ids(objs: tuple) -> List[int]:
+def _extract_ids(objs: tuple) -> FrozenSet[int]:
     """extract ids from multiple discord objs or ints"""
-    return [_extract_id(obj) for obj in objs]
-
-def _has_any_role(member: discord.Member, role_ids: List[int]) -> bool:
-    """check if member has any of the specified roles"""
-    return any(role.id in role_ids for role in member.roles)
+    return frozenset(_extract_id(obj) for obj in objs)
+
+def _member_role_ids(member: discord.Member) -> FrozenSet[int]:
+    """role ids of a member, through the public member.roles (it builds and sorts Role objects: cache the result)"""
+    return frozenset(role.id for role in member.roles)
+
+def _context(interaction: discord.Interaction) -> Dict[str, object]:
+    """cache dict of an interaction, expired and overflowing entries are evicted on creation"""
+    entry = _contexts.get(interaction.id)
+    if entry is not None:
+        return entry[1]
+    now = time.monotonic()
+    while _contexts:
+        interaction_id, (created, _) = next(iter(_contexts.items()))
+        if now - created < _CONTEXT_TTL and len(_contexts) < _CONTEXT_MAX:
+            break
+        del _contexts[interaction_id]
+    cache: Dict[str, object] = {}
+    _contexts[interaction.id] = (now, cache)
+    return cache
+
+def _cached(interaction: discord.Interaction, name: str, compute: Callable[[], object]):
+    """return a value computed once per interaction and shared by every predicate"""
+    cache = _context(interaction)
+    command = interaction.command.qualified_name if interaction.command else "?"
+    if name in cache:
+        _cache_hits[command] += 1
+        return cache[name]
+    _cache_misses[command] += 1
+    value = cache[name] = compute()
+    return value
+
+def _guild_permissions(interaction: discord.Interaction) -> discord.Permissions:
+    return _cached(interaction, "guild_permissions", lambda: interaction.user.guild_permissions)
+
+def _bot_channel_permissions(interaction: discord.Interaction) -> discord.Permissions:
+    return _cached(
+        interaction, "bot_channel_permissions", lambda: interaction.channel.permissions_for(interaction.guild.me)
+    )
+
+def _role_ids(interaction: discord.Interaction) -> FrozenSet[int]:
+    return _cached(interaction, "role_ids", lambda: _member_role_ids(interaction.user))
+
+def permission_cache_stats() -> Dict[str, Dict[str, int]]:
+    """per-command hits and misses of the per-interaction permission cache"""
+    return {
+        command: {"hits": _cache_hits[command], "misses": _cache_misses[command]}
+        for command in sorted(_cache_hits.keys() | _cache_misses.keys())
+    }
+
+def _check(predicate: Callable, cost: int) -> Callable:
+    """wrap predicate in app_commands.check, keeping it reachable for all_of/any_of"""
+    predicate.cost = cost
+    decorator = app_commands.check(predicate)
+    decorator.predicate = predicate
+    return decorator
+
+def _predicates(checks: tuple) -> List[Callable]:
+    """predicates of check decorators sorted cheapest-first"""
+    for check in checks:
+        if not hasattr(check, "predicate"):
+            raise TypeError(f"{check!r} is not a check from bot.core.checks")
+    return sorted((check.predicate for check in checks), key=lambda predicate: predicate.cost)
 
 # --- check decorators ---
 
@@ -39,16 +116,16 @@ def is_staff() -> Callable:
             return False
         if not _staff_roles_ids:
             return False
-        return _has_any_role(interaction.user, _staff_roles_ids)
-    return app_commands.check(predicate)
+        return not _staff_roles_ids.isdisjoint(_role_ids(interaction))
+    return _check(predicate, COST_ROLES)
 
 def is_server_admin() -> Callable:
     """check if user has admin permissions"""
     async def predicate(interaction: discord.Interaction) -> bool:
         if not isinstance(interaction.user, discord.Member):
             return False
-        return interaction.user.guild_permissions.administrator
-    return app_commands.check(predicate)
+        return _guild_permissions(interaction).administrator
+    return _check(predicate, COST_GUILD_PERMISSIONS)
 
 def is_server_owner() -> Callable:
     """check if user is server owner"""
@@ -56,57 +133,60 @@ def is_server_owner() -> Callable:
         if not interaction.guild:
             return False
         return interaction.user.id == interaction.guild.owner_id
-    return app_commands.check(predicate)
+    return _check(predicate, COST_ATTRIBUTE)
 
 def is_server_mod() -> Callable:
     """check if user has mod perms (manage messages, kick, ban)"""
     async def predicate(interaction: discord.Interaction) -> bool:
         if not isinstance(interaction.user, discord.Member):
             return False
-        perms = interaction.user.guild_permissions
+        perms = _guild_permissions(interaction)
         return perms.manage_messages or perms.kick_members or perms.ban_members
-    return app_commands.check(predicate)
+    return _check(predicate, COST_GUILD_PERMISSIONS)
 
 def has_permissions(**perms) -> Callable:
     """check if user has specific permissions"""
+    required = tuple(perm for perm, value in perms.items() if value)
     async def predicate(interaction: discord.Interaction) -> bool:
         if not isinstance(interaction.user, discord.Member):
             return False
-        user_perms = interaction.user.guild_permissions
-        return all(getattr(user_perms, perm, False) for perm in perms if perms[perm])
-    return app_commands.check(predicate)
+        user_perms = _guild_permissions(interaction)
+        return all(getattr(user_perms, perm, False) for perm in required)
+    return _check(predicate, COST_GUILD_PERMISSIONS)
 
 def has_any_role(*roles: Union[int, discord.Role]) -> Callable:
     """check if user has any of the specified roles (ids or Role objs)"""
+    role_ids = _extract_ids(roles)
     async def predicate(interaction: discord.Interaction) -> bool:
         if not isinstance(interaction.user, discord.Member):
             return False
-        return _has_any_role(interaction.user, _extract_ids(roles))
-    return app_commands.check(predicate)
+        return not role_ids.isdisjoint(_role_ids(interaction))
+    return _check(predicate, COST_ROLES)
 
 def has_all_roles(*roles: Union[int, discord.Role]) -> Callable:
     """check if user has all the specified roles (ids or Role objs)"""
+    role_ids = _extract_ids(roles)
     async def predicate(interaction: discord.Interaction) -> bool:
         if not isinstance(interaction.user, discord.Member):
             return False
-        member_role_ids = {role.id for role in interaction.user.roles}
-        required_ids = _extract_ids(roles)
-        return all(rid in member_role_ids for rid in required_ids)
-    return app_commands.check(predicate)
+        return role_ids.issubset(_role_ids(interaction))
+    return _check(predicate, COST_ROLES)
 
 def in_channel(*channels: Union[int, discord.abc.GuildChannel]) -> Callable:
     """check if cmd is used in specific channels (ids or Channel objs)"""
+    channel_ids = _extract_ids(channels)
     async def predicate(interaction: discord.Interaction) -> bool:
-        return interaction.channel_id in _extract_ids(channels)
-    return app_commands.check(predicate)
+        return interaction.channel_id in channel_ids
+    return _check(predicate, COST_ATTRIBUTE)
 
 def in_category(*categories: Union[int, discord.CategoryChannel]) -> Callable:
     """check if cmd is used in specific category (ids or Category objs)"""
+    category_ids = _extract_ids(categories)
     async def predicate(interaction: discord.Interaction) -> bool:
         if not interaction.channel or not hasattr(interaction.channel, 'category_id'):
             return False
-        return interaction.channel.category_id in _extract_ids(categories)
-    return app_commands.check(predicate)
+        return interaction.channel.category_id in category_ids
+    return _check(predicate, COST_ATTRIBUTE)
 
 def is_nsfw() -> Callable:
     """check if channel is nsfw"""
@@ -114,20 +194,59 @@ def is_nsfw() -> Callable:
         if not interaction.channel:
             return False
         return getattr(interaction.channel, 'nsfw', False)
-    return app_commands.check(predicate)
+    return _check(predicate, COST_ATTRIBUTE)
 
 def bot_has_permissions(**perms) -> Callable:
     """check if bot has specific permissions in channel"""
+    required = tuple(perm for perm, value in perms.items() if value)
     async def predicate(interaction: discord.Interaction) -> bool:
         if not interaction.guild or not interaction.channel:
             return False
         bot_member = interaction.guild.me
         if not bot_member:
             return False
-        channel_perms = interaction.channel.permissions_for(bot_member)
-        return all(getattr(channel_perms, perm, False) for perm in perms if perms[perm])
-    return app_commands.check(predicate)
-
-def cooldown(rate: int, per: float, *, key: Callable = None) -> Callable:
-    """apply cooldown to cmd (wrapper for app_commands.checks.cooldown)"""
-    return app_commands.checks.cooldown(rate, per, key=key)
+        channel_perms = _bot_channel_permissions(interaction)
+        return all(getattr(channel_perms, perm, False) for perm in required)
+    return _check(predicate, COST_CHANNEL_PERMISSIONS)
+
+def cooldown(rate: int, per: float, *, key: Callable = None, bucket: str = "user") -> Callable:
+    """apply cooldown to cmd: rate uses per `per` seconds, per user/channel/guild/role (bucket) or per custom key(interaction)
+
+    buckets live in the backend set by bot.core.cooldown.set_cooldown_backend (memory or shared SQLite)
+    """
+    if bucket not in _cooldown.BUCKETS:
+        raise ValueError(f"Unknown cooldown bucket: {bucket}")
+    get_key = key or _cooldown.BUCKETS[bucket]
+    bucket_name = "custom" if key else bucket
+    async def predicate(interaction: discord.Interaction) -> bool:
+        bucket_key = get_key(interaction)
+        if bucket_key is None:
+            return True
+        name = interaction.command.qualified_name if interaction.command else "?"
+        retry_after = await _cooldown.hit(name, bucket_name, bucket_key, rate, per)
+        if retry_after:
+            raise app_commands.CommandOnCooldown(app_commands.Cooldown(rate, per), retry_after)
+        return True
+    return _check(predicate, COST_COOLDOWN)
+
+# --- combinators ---
+
+def all_of(*checks: Callable) -> Callable:
+    """pass if every check passes, e.g. @all_of(is_staff(), in_channel(123)); cheapest checks run first and stop at the first failure"""
+    predicates = _predicates(checks)
+    async def predicate(interaction: discord.Interaction) -> bool:
+        for check in predicates:
+            if not await maybe_coroutine(check, interaction):
+                return False
+        return True
+    return _check(predicate, max((check.cost for check in predicates), default=COST_ATTRIBUTE))
+
+def any_of(*checks: Callable) -> Callable:
+    """pass if at least one check passes, e.g. @any_of(is_staff(), is_server_admin()); cheapest checks run first and stop at the first success"""
+    predicates = _predicates(checks)
+    async def predicate(interaction: discord.Interaction) -> bool:
+        for check in predicates:
+            if await maybe_coroutine(check, interaction):
+                return True
+        return False
+    return _check(predicate, max((check.cost for check in predicates), default=COST_ATTRIBUTE))
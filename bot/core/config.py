@@ -4,18 +4,23 @@ import logging
 import os
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List
+from typing import Callable, Dict, List, Mapping, Optional, Union
 
-import tomllib
-from dotenv import load_dotenv
+from ..core.settings import Settings, SettingsSchema
 
 
 @dataclass(frozen=True)
 class AppEnv:
     discord_token: str
-    guild_id: int
+    guild_ids: List[int]
     config_path: Path
     staff_roles_ids: List[int]
+    shard_count: Union[int, str, None] = None  # None: no sharding, "auto": ask Discord
+    shard_ids: Optional[List[int]] = None
+
+    @property
+    def guild_id(self) -> int:
+        return self.guild_ids[0]
 
 
 def _project_root() -> Path:
@@ -28,7 +33,7 @@ def load_env() -> AppEnv:
     try:
         app_env = os.getenv("APP_ENV", "dev").strip().lower()
     except Exception as e:
-        log.error(f"Error reading APP_ENV environment variable: {e}")
+        log.error("Error reading APP_ENV environment variable: %s", e)
 
     if app_env not in ("dev", "prod"):
         raise ValueError("APP_ENV environment variable must be 'dev' or 'prod'.")
@@ -43,20 +48,28 @@ def load_env() -> AppEnv:
     ]
     override = False
 
-    for path in candidates:
-        if path.exists():
-            log.info(f"Loaded environment variables from {path}")
-            load_dotenv(dotenv_path=path, override=override)
-        else:
-            load_dotenv()
+    from dotenv import find_dotenv, load_dotenv
+
+    found = [path for path in candidates if path.exists()]
+    for path in found:
+        log.info("Loaded environment variables from %s", path)
+        load_dotenv(dotenv_path=path, override=override)
+    if not found:
+        # no .env next to the project, fall back to python-dotenv's search from the working directory, once
+        dotenv_path = find_dotenv(usecwd=True)
+        if dotenv_path:
+            log.info("Loaded environment variables from %s", dotenv_path)
+            load_dotenv(dotenv_path=dotenv_path, override=override)
 
     try:
         discord_token = os.getenv("DISCORD_TOKEN").strip()
-        guild_id_str = os.getenv("GUILD_ID").strip()
+        guild_ids_str = (os.getenv("GUILD_IDS") or os.getenv("GUILD_ID")).strip()
         config_path_str = os.getenv("CONFIG_PATH", "config.toml").strip()
         staff_roles_ids_str = os.getenv("STAFF_ROLES_IDS", "").strip()
+        shard_count_str = os.getenv("SHARD_COUNT", "").strip().lower()
+        shard_ids_str = os.getenv("SHARD_IDS", "").strip()
     except Exception as e:
-        log.error(f"Error reading environment variables: {e}")
+        log.error("Error reading environment variables: %s", e)
         raise ValueError(
             "Error reading environment variables. Please check your .env files and environment settings."
         ) from e
@@ -64,9 +77,18 @@ def load_env() -> AppEnv:
     if not discord_token:
         log.error("DISCORD_TOKEN environment variable is missing.")
         raise ValueError("DISCORD_TOKEN environment variable is required.")
-    if not guild_id_str or not guild_id_str.isdigit():
-        log.error("GUILD_ID environment variable is missing or invalid.")
-        raise ValueError("GUILD_ID environment variable is required and must be an integer.")
+    guild_ids_parts = [part.strip() for part in guild_ids_str.split(",") if part.strip()]
+    if not guild_ids_parts or not all(part.isdigit() for part in guild_ids_parts):
+        log.error("GUILD_IDS / GUILD_ID environment variable is missing or invalid.")
+        raise ValueError(
+            "GUILD_IDS (or GUILD_ID) environment variable is required and must be a comma separated list of integers."
+        )
+    if shard_count_str and shard_count_str != "auto" and not shard_count_str.isdigit():
+        log.error("SHARD_COUNT environment variable is invalid.")
+        raise ValueError("SHARD_COUNT environment variable must be an integer or 'auto'.")
+    if shard_ids_str and not shard_count_str.isdigit():
+        log.error("SHARD_IDS requires an integer SHARD_COUNT.")
+        raise ValueError("SHARD_IDS requires SHARD_COUNT to be an integer.")
     if not config_path_str:
         log.error("CONFIG_PATH environment variable is missing.")
         raise ValueError("CONFIG_PATH environment variable is required.")
@@ -74,27 +96,33 @@ def load_env() -> AppEnv:
         log.warning("STAFF_ROLES_IDS environment variable is missing or empty.")
         staff_roles_ids_str = ""
 
-    guild_id = int(guild_id_str)
     config_path = Path(config_path_str)
+    shard_count: Union[int, str, None] = None
+    if shard_count_str:
+        shard_count = "auto" if shard_count_str == "auto" else int(shard_count_str)
 
     return AppEnv(
         discord_token=discord_token,
-        guild_id=guild_id,
+        guild_ids=[int(part) for part in guild_ids_parts],
         config_path=config_path,
         staff_roles_ids=[int(role_id) for role_id in staff_roles_ids_str.split(",") if role_id],
+        shard_count=shard_count,
+        shard_ids=[int(shard_id) for shard_id in shard_ids_str.split(",") if shard_id.strip()] or None,
     )
 
 
 def load_config(config_path: Path) -> Dict:
     log = logging.getLogger(__name__)
     if not config_path.exists():
-        log.error(f"Configuration file not found at {config_path}")
+        log.error("Configuration file not found at %s", config_path)
         raise FileNotFoundError(f"Configuration file not found at {config_path}")
 
+    import tomllib
+
     data = tomllib.loads(config_path.read_text(encoding="utf-8"))
     for key in ("enabled_features", "features"):
         if key not in data:
-            log.error(f"Missing required configuration key: {key}")
+            log.error("Missing required configuration key: %s", key)
             raise KeyError(f"Missing required configuration key: {key}")
 
     if not isinstance(data["enabled_features"], list):
@@ -104,4 +132,87 @@ def load_config(config_path: Path) -> Dict:
         log.error("features must be a dictionary.")
         raise TypeError("features must be a dictionary.")
 
+    guilds = data.setdefault("guilds", {})
+    if not isinstance(guilds, dict) or not all(str(key).isdigit() for key in guilds):
+        log.error("guilds must be a dictionary keyed by guild id.")
+        raise TypeError("guilds must be a dictionary keyed by guild id.")
+    for guild_id, overlay in guilds.items():
+        if not isinstance(overlay, dict) or not isinstance(overlay.get("features", {}), dict):
+            log.error("guilds.%s.features must be a dictionary.", guild_id)
+            raise TypeError(f"guilds.{guild_id}.features must be a dictionary.")
+
     return data
+
+
+def _merge(base: Mapping, overlay: Mapping) -> Dict:
+    merged = dict(base)
+    for key, value in overlay.items():
+        if isinstance(value, Mapping) and isinstance(merged.get(key), Mapping):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+class _GuildSettings(dict):
+    """guild id -> Settings, a guild without overlay gets the base settings, stored on its first lookup
+
+    settings_for is this dict's __getitem__: after the first interaction of a guild, a lookup never leaves C.
+    """
+
+    def __init__(self, base: Optional[Settings], overlays: Dict[int, Settings]) -> None:
+        super().__init__(overlays)
+        self.base = base
+
+    def __missing__(self, guild_id: Optional[int]) -> Optional[Settings]:
+        self[guild_id] = self.base
+        return self.base
+
+
+class FeatureConfig(dict):
+    """Config section of a feature ([features.<slug>]) with its per-guild overlays ([guilds.<id>.features.<slug>])
+
+    Behaves as the base section dict. for_guild(guild_id) returns the section merged with that guild's overlay,
+    merged once and cached, so handlers can call it on every interaction.
+    """
+
+    def __init__(self, base: Mapping, overlays: Optional[Dict[int, Mapping]] = None) -> None:
+        super().__init__(base)
+        self._overlays = overlays or {}
+        self._resolved: Dict[Optional[int], FeatureConfig] = {}
+        self.settings: Optional[Settings] = None
+        self._guild_settings = _GuildSettings(None, {})
+        # the bound __getitem__ of the table, no Python frame per call; replaced by bind
+        self.settings_for: Callable[[Optional[int]], Optional[Settings]] = self._guild_settings.__getitem__
+
+    def bind(self, schema: SettingsSchema) -> None:
+        """validate the section and every guild overlay against the feature's SETTINGS, raises SettingsError
+
+        Afterwards settings_for(guild_id) returns frozen slotted objects, built here once.
+        """
+        self.settings = schema.build(self)
+        self._guild_settings = _GuildSettings(
+            self.settings,
+            {
+                guild_id: schema.build(self.for_guild(guild_id), f"guilds.{guild_id}.features.{schema.slug}")
+                for guild_id in self._overlays
+            },
+        )
+        self.settings_for = self._guild_settings.__getitem__
+
+    def for_guild(self, guild_id: Optional[int]) -> "FeatureConfig":
+        resolved = self._resolved.get(guild_id)
+        if resolved is None:
+            overlay = self._overlays.get(guild_id)
+            resolved = self._resolved[guild_id] = FeatureConfig(_merge(self, overlay)) if overlay else self
+        return resolved
+
+
+def feature_config(config: Dict, slug: str) -> FeatureConfig:
+    """build the FeatureConfig of a feature from the full config"""
+    overlays = {
+        int(guild_id): guild["features"][slug]
+        for guild_id, guild in config.get("guilds", {}).items()
+        if slug in guild.get("features", {})
+    }
+    return FeatureConfig(config.get("features", {}).get(slug, {}), overlays)
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+import discord
+
+from ..core.config import _project_root
+
+log = logging.getLogger(__name__)
+
+# cooldown engine used by bot.core.checks.cooldown
+# every bucket is a token bucket: `rate` tokens refilled over `per` seconds
+
+
+def _refill(tokens: float, updated: float, now: float, rate: int, per: float) -> float:
+    return min(float(rate), tokens + (now - updated) * rate / per)
+
+
+def _consume(tokens: float, rate: int, per: float) -> Tuple[float, float]:
+    """take one token, return (tokens left, retry_after); retry_after is 0 when the call is allowed"""
+    if tokens >= 1.0:
+        return tokens - 1.0, 0.0
+    return tokens, (1.0 - tokens) * per / rate
+
+
+class CooldownBackend(ABC):
+    """storage of the token buckets"""
+
+    @abstractmethod
+    async def hit(self, key: str, rate: int, per: float) -> float:
+        """consume one token of the bucket `key`, return 0 if allowed or the seconds to wait otherwise"""
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryBackend(CooldownBackend):
+    """in-process buckets, bounded to `max_keys`
+
+    A bucket that is back to full capacity holds no information: past `max_keys`, the refilled buckets are dropped
+    first, and the least recently used one only when every bucket is still cooling down. A user can then bypass a
+    cooldown only if more than `max_keys` keys are cooling down at the same time.
+    """
+
+    # seconds between two sweeps for refilled buckets, in between an overflow evicts the least recently used key
+    SWEEP_INTERVAL = 1.0
+
+    def __init__(self, max_keys: int = 10_000) -> None:
+        self.max_keys = max_keys
+        # key -> (tokens, updated, full_at), full_at being when the bucket is back to full capacity
+        self._buckets: "OrderedDict[str, Tuple[float, float, float]]" = OrderedDict()
+        self._swept_at = float("-inf")
+
+    async def hit(self, key: str, rate: int, per: float) -> float:
+        now = time.monotonic()
+        bucket = self._buckets.pop(key, None)
+        tokens = float(rate) if bucket is None else _refill(bucket[0], bucket[1], now, rate, per)
+        tokens, retry_after = _consume(tokens, rate, per)
+        self._buckets[key] = (tokens, now, now + (rate - tokens) * per / rate)
+        if len(self._buckets) > self.max_keys:
+            self._evict(now)
+        return retry_after
+
+    def _evict(self, now: float) -> None:
+        if now - self._swept_at >= self.SWEEP_INTERVAL:
+            self._swept_at = now
+            for key in [key for key, (_, _, full_at) in self._buckets.items() if full_at <= now]:
+                del self._buckets[key]
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+
+class SQLiteBackend(CooldownBackend):
+    """buckets stored in a SQLite file (WAL mode) so several bot processes on the same host share them
+
+    Each hit is one IMMEDIATE transaction run off the event loop. Rows whose bucket is full again are pruned every
+    `prune_every` hits.
+    """
+
+    def __init__(self, path: Path, *, prune_every: int = 1000) -> None:
+        import sqlite3
+
+        self.path = path
+        self.prune_every = prune_every
+        self._hits = 0
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cooldowns (key TEXT PRIMARY KEY, tokens REAL NOT NULL, "
+            "updated REAL NOT NULL, full_at REAL NOT NULL)"
+        )
+
+    def _hit(self, key: str, rate: int, per: float) -> float:
+        # wall clock: buckets are shared between processes
+        now = time.time()
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT tokens, updated FROM cooldowns WHERE key = ?", (key,)).fetchone()
+                tokens = float(rate) if row is None else _refill(row[0], row[1], now, rate, per)
+                tokens, retry_after = _consume(tokens, rate, per)
+                full_at = now + (rate - tokens) * per / rate
+                conn.execute(
+                    "INSERT OR REPLACE INTO cooldowns (key, tokens, updated, full_at) VALUES (?, ?, ?, ?)",
+                    (key, tokens, now, full_at),
+                )
+                self._hits += 1
+                if self._hits % self.prune_every == 0:
+                    conn.execute("DELETE FROM cooldowns WHERE full_at < ?", (now,))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return retry_after
+
+    async def hit(self, key: str, rate: int, per: float) -> float:
+        return await asyncio.to_thread(self._hit, key, rate, per)
+
+    async def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# --- bucket keys ---
+
+
+def _role_key(interaction: discord.Interaction) -> Optional[int]:
+    user = interaction.user
+    return user.top_role.id if isinstance(user, discord.Member) else None
+
+
+BUCKETS: Dict[str, Callable[[discord.Interaction], Optional[Hashable]]] = {
+    "user": lambda interaction: interaction.user.id,
+    "channel": lambda interaction: interaction.channel_id,
+    "guild": lambda interaction: interaction.guild_id or interaction.user.id,
+    "role": _role_key,
+}
+
+
+_backend: CooldownBackend = MemoryBackend()
+
+
+def set_cooldown_backend(backend: CooldownBackend) -> None:
+    """set the backend used by every cooldown check"""
+    global _backend
+    _backend = backend
+
+
+def get_cooldown_backend() -> CooldownBackend:
+    return _backend
+
+
+def backend_from_config(config: Dict) -> CooldownBackend:
+    """build a backend from the [cooldown] config table (backend = "memory" or "sqlite")"""
+    kind = config.get("backend", "memory")
+    if kind == "memory":
+        return MemoryBackend(max_keys=config.get("max_keys", 10_000))
+    if kind == "sqlite":
+        path = Path(config.get("path", "data/cooldowns.db"))
+        return SQLiteBackend(path if path.is_absolute() else _project_root() / path)
+    raise ValueError(f"Unknown cooldown backend: {kind}")
+
+
+async def hit(name: str, bucket: str, key: Hashable, rate: int, per: float) -> float:
+    return await _backend.hit(f"{name}:{bucket}:{key}", rate, per)
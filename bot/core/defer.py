@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+from typing import Callable, Dict, Optional
+
+import discord
+from discord import app_commands
+
+log = logging.getLogger(__name__)
+
+# features opt in through their FEATURE dictionary:
+#   "auto_defer": True                                  -> defer after DEFAULT_BUDGET seconds
+#   "auto_defer": 1.5                                   -> defer after 1.5 seconds
+#   "auto_defer": {"budget": 1.5, "ephemeral": True}    -> the deferred answer is ephemeral
+
+DEFAULT_BUDGET = 2.0  # seconds, Discord allows 3 for the initial response
+
+
+def _options(value) -> Optional[Dict]:
+    if value is None or value is False:
+        return None
+    if value is True:
+        return {"budget": DEFAULT_BUDGET, "ephemeral": False}
+    if isinstance(value, (int, float)):
+        return {"budget": float(value), "ephemeral": False}
+    if isinstance(value, dict):
+        return {"budget": float(value.get("budget", DEFAULT_BUDGET)), "ephemeral": bool(value.get("ephemeral", False))}
+    raise TypeError(f"Invalid auto_defer value: {value!r}")
+
+
+class DeferringResponse:
+    """stands in for interaction.response: once the interaction was deferred, send_message goes to followup.send"""
+
+    def __init__(self, interaction: discord.Interaction) -> None:
+        self._interaction = interaction
+        self._lock = asyncio.Lock()
+        self.deferred = False
+
+    def __getattr__(self, name: str):
+        return getattr(self._interaction.response, name)
+
+    def is_done(self) -> bool:
+        return self._interaction.response.is_done()
+
+    async def send_message(self, *args, **kwargs):
+        async with self._lock:
+            if not self.deferred:
+                return await self._interaction.response.send_message(*args, **kwargs)
+            # followup.send has no delete_after
+            kwargs.pop("delete_after", None)
+            return await self._interaction.followup.send(*args, **kwargs)
+
+    async def defer(self, **kwargs) -> None:
+        async with self._lock:
+            if self.deferred:
+                return
+            await self._interaction.response.defer(**kwargs)
+            self.deferred = True
+
+    async def defer_if_pending(self, *, ephemeral: bool) -> bool:
+        """defer unless the handler already responded, return True if it deferred"""
+        async with self._lock:
+            if self._interaction.response.is_done():
+                return False
+            await self._interaction.response.defer(ephemeral=ephemeral, thinking=True)
+            self.deferred = True
+            return True
+
+
+class DeferringInteraction:
+    """the interaction given to auto-deferred handlers: the real one, except for .response"""
+
+    def __init__(self, interaction: discord.Interaction, response: DeferringResponse) -> None:
+        self._interaction = interaction
+        self.response = response
+
+    def __getattr__(self, name: str):
+        return getattr(self._interaction, name)
+
+
+def auto_defer(callback: Callable, command: app_commands.Command, feature_info: Dict) -> Callable:
+    """command wrapper for load_features: defer the interaction if the handler did not respond within its budget"""
+    options = _options(feature_info.get("auto_defer"))
+    if options is None:
+        return callback
+    budget, ephemeral = options["budget"], options["ephemeral"]
+
+    @functools.wraps(callback)
+    async def wrapper(*args, **kwargs):
+        interaction: discord.Interaction = args[-1]
+        response = DeferringResponse(interaction)
+        task = asyncio.ensure_future(callback(*args[:-1], DeferringInteraction(interaction, response), **kwargs))
+        try:
+            done, _ = await asyncio.wait({task}, timeout=budget)
+            if not done and await response.defer_if_pending(ephemeral=ephemeral):
+                log.debug("Deferred /%s after %.1f s", command.qualified_name, budget)
+            return await task
+        finally:
+            if not task.done():
+                task.cancel()
+
+    return wrapper
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import os
+import platform
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+import discord
+
+from ..core.config import _project_root
+
+if TYPE_CHECKING:
+    from ..core.bot import BotApp
+
+log = logging.getLogger(__name__)
+
+
+def process_start_time() -> Optional[float]:
+    """wall-clock time the process was started at, read from /proc (Linux), None where it is not available"""
+    try:
+        with open("/proc/self/stat", "rb") as stat:
+            # fields after the command name, which may contain spaces: state is field 3, starttime field 22
+            fields = stat.read().rsplit(b")", 1)[1].split()
+        with open("/proc/uptime", "rb") as uptime:
+            since_boot = float(uptime.read().split()[0])
+        return time.time() - since_boot + int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """the runtime state of the bot at `taken_at`, read by /version without computing anything"""
+
+    taken_at: float  # time.time()
+    features: Tuple[Tuple[str, str], ...]  # (slug, version) of the loaded features, by slug
+    python: str
+    discord_py: str
+    commit: Optional[str]
+    uptime: float  # seconds
+    latency: Optional[float]  # seconds, None before the first heartbeat
+    rss: Optional[int]  # bytes
+    tasks: int
+
+
+def git_commit(root: Path) -> Optional[str]:
+    """the commit checked out in root, read from .git without running git"""
+    git_dir = root / ".git"
+    try:
+        if git_dir.is_file():  # worktree or submodule: "gitdir: <path>"
+            git_dir = (root / git_dir.read_text(encoding="utf-8").split(":", 1)[1].strip()).resolve()
+        head = (git_dir / "HEAD").read_text(encoding="utf-8").strip()
+        if not head.startswith("ref: "):
+            return head  # detached
+        ref = head[5:]
+        ref_path = git_dir / ref
+        if ref_path.is_file():
+            return ref_path.read_text(encoding="utf-8").strip()
+        packed = git_dir / "packed-refs"
+        if packed.is_file():
+            for line in packed.read_text(encoding="utf-8").splitlines():
+                if line.endswith(" " + ref):
+                    return line.split(" ", 1)[0]
+    except (OSError, IndexError):
+        pass
+    return None
+
+
+def resident_memory() -> Optional[int]:
+    """resident set size of the process in bytes, None where it cannot be read without extra dependencies"""
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    # no /proc (macOS): peak RSS, in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class DiagnosticsCollector:
+    """takes a Snapshot every `interval` seconds in a background task
+
+    The git commit is read once, in a worker thread before the first snapshot; everything else is refreshed on every
+    snapshot.
+    """
+
+    def __init__(self, bot: "BotApp", *, interval: float = 15.0, started_at: Optional[float] = None) -> None:
+        self.bot = bot
+        self.interval = interval
+        # uptime counts from the process start, else from started_at (time.time()), else from now
+        started = process_start_time() or started_at or time.time()
+        self._start = time.monotonic() - max(time.time() - started, 0.0)
+        self.snapshot: Optional[Snapshot] = None
+        self._commit: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def collect(self) -> Snapshot:
+        latency = self.bot.latency  # nan before the first heartbeat
+        loaded = getattr(self.bot, "features", {})
+        self.snapshot = Snapshot(
+            taken_at=time.time(),
+            features=tuple(sorted((slug, str(module.FEATURE.get("version", "?"))) for slug, module in loaded.items())),
+            python=platform.python_version(),
+            discord_py=discord.__version__,
+            commit=self._commit,
+            uptime=time.monotonic() - self._start,
+            latency=latency if math.isfinite(latency) else None,
+            rss=resident_memory(),
+            tasks=len(asyncio.all_tasks()),
+        )
+        return self.snapshot
+
+    async def _run(self) -> None:
+        try:
+            self._commit = await asyncio.to_thread(git_commit, _project_root())
+        except Exception as e:
+            log.error("Failed to read the git commit: %s", e)
+        while True:
+            try:
+                self.collect()
+            except Exception as e:
+                log.error("Failed to collect diagnostics: %s", e)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="diagnostics")
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def collector_from_config(bot: "BotApp", diagnostics_config: Dict) -> DiagnosticsCollector:
+    """build the DiagnosticsCollector described by the [diagnostics] config table"""
+    return DiagnosticsCollector(bot, interval=diagnostics_config.get("interval", 15.0), started_at=bot.started_at)
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Optional
+
+from discord import app_commands
+
+from ..core.metrics import MetricsRegistry
+
+log = logging.getLogger(__name__)
+
+# features opt in through their FEATURE dictionary, every key being optional:
+#   "execution": {
+#       "max_concurrency": 4,     -> at most 4 handlers of the feature run at once, the next ones wait their turn
+#       "timeout": 10.0,          -> a handler still running after 10 seconds (waiting included) is cancelled
+#       "breaker_errors": 5,      -> after 5 failures in a row the feature is switched off...
+#       "breaker_reset": 30.0,    -> ...for 30 seconds, then one invocation is let through to probe it
+#       "process_pool": True,     -> the shared process pool is started with the feature (see run_in_process)
+#   }
+# the limits are shared by all the commands of a feature.
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+_BREAKER_STATES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class FeatureUnavailable(app_commands.AppCommandError):
+    """the circuit breaker of the feature is open"""
+
+    def __init__(self, slug: str, retry_after: float) -> None:
+        self.slug = slug
+        self.retry_after = retry_after
+        super().__init__(f"Feature {slug} is unavailable, retry in {retry_after:.0f} s")
+
+
+class HandlerTimeout(app_commands.AppCommandError):
+    """the handler did not finish within the timeout of its feature"""
+
+    def __init__(self, slug: str, timeout: float) -> None:
+        self.slug = slug
+        self.timeout = timeout
+        super().__init__(f"Handler of feature {slug} timed out after {timeout:.1f} s")
+
+
+def _options(value) -> Optional[Dict]:
+    if value is None:
+        return None
+    if not isinstance(value, dict):
+        raise TypeError(f"Invalid execution value: {value!r}")
+    unknown = set(value) - {"max_concurrency", "timeout", "breaker_errors", "breaker_reset", "process_pool"}
+    if unknown:
+        raise TypeError(f"Unknown execution option(s): {', '.join(sorted(unknown))}")
+    options = {
+        "max_concurrency": value.get("max_concurrency"),
+        "timeout": value.get("timeout"),
+        "breaker_errors": value.get("breaker_errors"),
+        "breaker_reset": float(value.get("breaker_reset", 30.0)),
+        "process_pool": bool(value.get("process_pool", False)),
+    }
+    for key in ("max_concurrency", "timeout", "breaker_errors"):
+        if options[key] is not None and (isinstance(options[key], bool) or options[key] <= 0):
+            raise TypeError(f"Invalid execution {key}: {options[key]!r}")
+    return options
+
+
+class CircuitBreaker:
+    """opens after `errors` failures in a row, lets one call through `reset_after` seconds later"""
+
+    def __init__(self, errors: int, reset_after: float) -> None:
+        self.errors = errors
+        self.reset_after = reset_after
+        self.failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+
+    def retry_after(self) -> float:
+        """seconds before a call is let through, 0 if one may run now (and, when half-open, becomes the probe)"""
+        if self.state == CLOSED:
+            return 0.0
+        if self.state == OPEN:
+            remaining = self.opened_at + self.reset_after - time.monotonic()
+            if remaining > 0:
+                return remaining
+            self.state = HALF_OPEN
+            return 0.0
+        # half-open with the probe still running
+        return self.reset_after
+
+    def record(self, success: bool) -> None:
+        if success:
+            self.failures = 0
+            self.state = CLOSED
+            return
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.errors:
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+
+class _FeaturePolicy:
+    """the runtime state of one feature's execution options"""
+
+    def __init__(self, slug: str, options: Dict) -> None:
+        self.slug = slug
+        self.options = options
+        self.timeout: Optional[float] = options["timeout"]
+        self.semaphore = asyncio.Semaphore(options["max_concurrency"]) if options["max_concurrency"] else None
+        self.breaker = (
+            CircuitBreaker(options["breaker_errors"], options["breaker_reset"]) if options["breaker_errors"] else None
+        )
+        self.running = 0
+        self.waiting = 0
+
+    async def _run(self, callback: Callable, args, kwargs):
+        if self.semaphore is None:
+            return await callback(*args, **kwargs)
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            return await callback(*args, **kwargs)
+        finally:
+            self.semaphore.release()
+
+    async def call(self, callback: Callable, args, kwargs):
+        probe = False
+        if self.breaker is not None:
+            retry_after = self.breaker.retry_after()
+            if retry_after:
+                raise FeatureUnavailable(self.slug, retry_after)
+            probe = self.breaker.state == HALF_OPEN
+        self.running += 1
+        success: Optional[bool] = False
+        try:
+            if self.timeout is None:
+                result = await self._run(callback, args, kwargs)
+            else:
+                try:
+                    result = await asyncio.wait_for(self._run(callback, args, kwargs), timeout=self.timeout)
+                except asyncio.TimeoutError:
+                    raise HandlerTimeout(self.slug, self.timeout) from None
+            success = True
+            return result
+        except app_commands.CheckFailure:
+            # a refusal says nothing about the health of the feature
+            success = True
+            raise
+        except asyncio.CancelledError:
+            # neither a success nor a failure (shutdown, interaction abandoned), except for the probe: it holds the
+            # only slot of a half-open breaker, which would stay half-open and refuse every call if nothing was recorded
+            success = False if probe else None
+            raise
+        finally:
+            self.running -= 1
+            if self.breaker is not None and success is not None:
+                state = self.breaker.state
+                self.breaker.record(success)
+                if self.breaker.state == OPEN and state != OPEN:
+                    log.warning(
+                        "Circuit breaker of feature %s opened after %d error(s), retrying in %.0f s",
+                        self.slug,
+                        self.breaker.failures,
+                        self.breaker.reset_after,
+                    )
+                elif self.breaker.state == CLOSED and state == HALF_OPEN:
+                    log.info("Circuit breaker of feature %s closed", self.slug)
+
+
+class ExecutionGuard:
+    """applies the `execution` options of FEATURE dictionaries and owns the shared process pool"""
+
+    def __init__(self, *, process_workers: int = 2) -> None:
+        self.process_workers = max(process_workers, 1)
+        self._policies: Dict[str, _FeaturePolicy] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def policy(self, slug: str) -> Optional[_FeaturePolicy]:
+        return self._policies.get(slug)
+
+    def wrap(self, callback: Callable, command: app_commands.Command, feature_info: Dict) -> Callable:
+        """command wrapper for load_features, meant to be the innermost one so waiting for a slot can be deferred"""
+        options = _options(feature_info.get("execution"))
+        slug = feature_info.get("slug", "?")
+        if options is None:
+            self._policies.pop(slug, None)
+            return callback
+        policy = self._policies.get(slug)
+        # a /reload keeps the running state (slots, breaker) unless the options changed
+        if policy is None or policy.options != options:
+            policy = self._policies[slug] = _FeaturePolicy(slug, options)
+        if options["process_pool"]:
+            self._start_pool()
+
+        @functools.wraps(callback)
+        async def wrapper(*args, **kwargs):
+            return await policy.call(callback, args, kwargs)
+
+        return wrapper
+
+    # --- process pool ---
+
+    def _start_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            import multiprocessing
+
+            # spawn: forking a process that runs threads (logging, storage) is not safe
+            self._pool = ProcessPoolExecutor(self.process_workers, mp_context=multiprocessing.get_context("spawn"))
+            log.info("Process pool started (%d workers)", self.process_workers)
+        return self._pool
+
+    async def run_in_process(self, fn: Callable, *args):
+        """run fn(*args) in the shared process pool, off the event loop
+
+        fn must be a module-level function and args picklable: the interaction cannot cross the process boundary,
+        so a CPU-heavy handler computes there and answers from the event loop.
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._start_pool(), fn, *args)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _handler_counts(self) -> Dict:
+        counts = {}
+        for slug, policy in self._policies.items():
+            counts[(("feature", slug), ("state", "running"))] = policy.running - policy.waiting
+            counts[(("feature", slug), ("state", "waiting"))] = policy.waiting
+        return counts
+
+    def register_metrics(self, registry: MetricsRegistry) -> None:
+        registry.add_gauge(
+            "pybot_feature_handlers",
+            "Handlers of features with an execution policy, running or waiting for a slot.",
+            self._handler_counts,
+        )
+        registry.add_gauge(
+            "pybot_feature_breaker_state",
+            "Circuit breaker state per feature: 0 closed, 1 half-open, 2 open.",
+            lambda: {
+                (("feature", slug),): _BREAKER_STATES[policy.breaker.state]
+                for slug, policy in self._policies.items()
+                if policy.breaker is not None
+            },
+        )
+
+
+def guard_from_config(execution_config: Dict) -> ExecutionGuard:
+    """build the ExecutionGuard described by the [execution] config table"""
+    return ExecutionGuard(process_workers=execution_config.get("process_workers", 2))
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import discord
+
+from ..core.loader import read_manifest
+
+log = logging.getLogger(__name__)
+
+# features declare what they need in their FEATURE dictionary, everything else is turned off:
+#   "intents": ["members", "guild_messages"]      -> discord.Intents flag names
+#   "member_cache": ["joined"]                    -> discord.MemberCacheFlags names ("joined", "voice")
+#   "max_messages": 200                           -> size of the message cache, 0 disables it
+
+# slash commands only need the guild cache (roles, channels, permissions and guild.me)
+BASE_INTENTS = ("guilds",)
+
+# member cache flags only work with their intent
+CACHE_INTENTS = {"joined": "members", "voice": "voice_states"}
+
+# rough cost of a cached message, used for the startup report
+DEFAULT_MAX_MESSAGES = 1000
+MESSAGE_BYTES = 2_500
+# rough cost per guild member of the member cache (Member and User objects) and of its presence (status,
+# activities), used for the startup report; member counts are unknown before connecting, so per REPORT_MEMBERS members
+MEMBER_BYTES = 1_000
+PRESENCE_BYTES = 600
+REPORT_MEMBERS = 10_000
+
+
+@dataclass
+class GatewayPolicy:
+    intents: discord.Intents
+    member_cache_flags: discord.MemberCacheFlags
+    max_messages: Optional[int]
+    requested_by: Dict[str, List[str]] = field(default_factory=dict)  # intent or cache flag -> feature slugs
+
+    def options(self) -> Dict:
+        """keyword arguments for the discord.Client constructor"""
+        return {
+            "intents": self.intents,
+            "member_cache_flags": self.member_cache_flags,
+            "max_messages": self.max_messages,
+        }
+
+    def report(self) -> str:
+        """summary of the policy against discord.Intents.default() and the default message cache"""
+        default = discord.Intents.default()
+        disabled = sorted(name for name, value in default if value and not getattr(self.intents, name))
+        enabled = sorted(name for name, value in self.intents if value)
+        saved_messages = (DEFAULT_MAX_MESSAGES - (self.max_messages or 0)) * MESSAGE_BYTES
+        per = f"per {REPORT_MEMBERS // 1000}k guild members"
+        members_mb = REPORT_MEMBERS * MEMBER_BYTES / 1_000_000
+        presences_mb = REPORT_MEMBERS * PRESENCE_BYTES / 1_000_000
+        # the default intents cache neither, the savings are against a bot enabling the members / presences intents
+        if self.member_cache_flags.joined:
+            members = f"estimated {members_mb:.1f} MB {per}"
+        else:
+            members = f"estimated {members_mb:.1f} MB {per} saved vs the members intent"
+        if self.intents.presences:
+            presences = f"on (estimated {presences_mb:.1f} MB {per}, plus PRESENCE_UPDATE traffic)"
+        else:
+            presences = f"off (estimated {presences_mb:.1f} MB {per} and the PRESENCE_UPDATE traffic saved)"
+        lines = [
+            f"intents: {', '.join(enabled)}",
+            f"disabled vs default: {', '.join(disabled) or 'none'}",
+            f"member cache: {', '.join(name for name, value in self.member_cache_flags if value) or 'none'} "
+            f"({members})",
+            f"presences: {presences}",
+            f"message cache: {self.max_messages or 0} (estimated {saved_messages / 1_000_000:.1f} MB saved)",
+        ]
+        for name, slugs in sorted(self.requested_by.items()):
+            lines.append(f"{name} requested by {', '.join(slugs)}")
+        return "\n".join(lines)
+
+
+def gateway_policy(config: Dict) -> GatewayPolicy:
+    """Compute the minimal gateway policy for the enabled features, reading each FEATURE without importing it
+
+    A feature whose FEATURE dictionary cannot be read statically gets the discord.py defaults, to stay on the safe side.
+    """
+    intents = discord.Intents.none()
+    for name in BASE_INTENTS:
+        setattr(intents, name, True)
+    cache = discord.MemberCacheFlags.none()
+    max_messages = 0
+    requested_by: Dict[str, List[str]] = {}
+
+    for slug in config["enabled_features"]:
+        try:
+            manifest = read_manifest(slug)
+        except Exception as e:
+            log.warning("Cannot read FEATURE of %s statically (%s), falling back to default intents", slug, e)
+            intents |= discord.Intents.default()
+            cache |= discord.MemberCacheFlags.from_intents(discord.Intents.default())
+            max_messages = max(max_messages, DEFAULT_MAX_MESSAGES)
+            continue
+
+        for name in manifest.get("intents", []):
+            if name not in discord.Intents.VALID_FLAGS:
+                raise ValueError(f"Feature {slug} requests unknown intent {name!r}")
+            setattr(intents, name, True)
+            requested_by.setdefault(name, []).append(slug)
+        for name in manifest.get("member_cache", []):
+            if name not in CACHE_INTENTS:
+                raise ValueError(f"Feature {slug} requests unknown member cache flag {name!r}")
+            setattr(cache, name, True)
+            setattr(intents, CACHE_INTENTS[name], True)
+            requested_by.setdefault(f"member_cache.{name}", []).append(slug)
+        max_messages = max(max_messages, int(manifest.get("max_messages", 0)))
+
+    return GatewayPolicy(intents, cache, max_messages or None, requested_by)
+
+
+def missing_intents(slug: str, intents: discord.Intents) -> List[str]:
+    """intents the feature declares that the running client was not started with (they need a restart)"""
+    policy = gateway_policy({"enabled_features": [slug]})
+    return sorted(name for name, value in policy.intents if value and not getattr(intents, name))
@@ -0,0 +1,353 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import functools
+import inspect
+import json
+import logging
+import signal
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, Optional, Set
+
+import discord
+import yarl
+from discord import app_commands
+from discord.gateway import DiscordWebSocket
+from discord.state import ConnectionState
+
+from ..core.config import _project_root
+
+if TYPE_CHECKING:
+    from ..core.bot import BotApp
+
+log = logging.getLogger(__name__)
+
+# graceful shutdown, on SIGTERM / SIGINT or BotApp.shutdown():
+#   1. new slash commands are refused with an ephemeral message
+#   2. running handlers, and the jobs they started with Lifecycle.spawn, get up to drain_timeout seconds to finish;
+#      the jobs still running are then cancelled and get a few seconds to report where they stopped
+#   3. the feature watcher is stopped, queued background sends and pending storage writes are flushed
+#   4. the gateway session (id, sequence, resume url) is written to session_path and the websocket is closed with
+#      code 4000: a 1000 close would end the session on Discord's side
+# logs are flushed by stop_logging once the client has stopped. The next process reads the session file and sends
+# RESUME instead of IDENTIFY if the session is less than resume_max_age seconds old.
+#
+# caveats:
+#   - a resumed session gets neither READY nor GUILD_CREATE, so the cache starts empty: the guilds of GUILD_IDS are
+#     fetched back over REST (guild and roles, channels, the bot member), members and messages are not.
+#   - Discord only keeps a session for a short while. If it expired, Discord answers INVALID_SESSION and discord.py
+#     falls back to a normal IDENTIFY (on_ready fires as usual).
+#   - sharded processes (SHARD_COUNT) always IDENTIFY: discord.py waits for a READY from every shard.
+#   - without loop signal handlers (Windows), Ctrl+C stops the bot the usual way, without draining.
+#   - resuming goes through discord.py internals, all of them in _ResumeAdapter and checked by resume_unsupported: on
+#     a release where they changed, resume is switched off at startup and the bot identifies as usual.
+#   - experimental, off by default: after a resume the cache has no members but the bot's, no threads, emojis or
+#     stickers until Discord sends events about them.
+
+DRAINING_MESSAGE = "🔄 Le bot redémarre, réessaie dans quelques secondes."
+JOB_CANCEL_TIMEOUT = 5.0  # seconds cancelled background jobs get to report their partial result
+
+# discord.py releases the resume path was written against
+RESUME_DISCORD_VERSIONS = ((2, 0), (3, 0))
+
+
+def resume_unsupported() -> Optional[str]:
+    """why the installed discord.py cannot resume a saved session, None if it can"""
+    version = (discord.version_info.major, discord.version_info.minor)
+    low, high = RESUME_DISCORD_VERSIONS
+    if not low <= version < high:
+        return f"discord.py {discord.__version__} is not supported"
+    from_client = DiscordWebSocket.__dict__.get("from_client")
+    if not isinstance(from_client, classmethod):
+        return "DiscordWebSocket.from_client is not a classmethod"
+    parameters = inspect.signature(from_client.__func__).parameters
+    missing = [name for name in ("initial", "gateway", "session", "sequence", "resume") if name not in parameters]
+    if missing:
+        return "DiscordWebSocket.from_client has no parameter " + ", ".join(missing)
+    for owner, name in ((discord.Guild, "_add_channel"), (discord.Guild, "_add_member"), (ConnectionState, "_add_guild")):
+        if not callable(getattr(owner, name, None)):
+            return f"{owner.__name__}.{name} is missing"
+    return None
+
+
+class _ResumeAdapter:
+    """the discord.py internals used to resume a session in a fresh process, checked by resume_unsupported"""
+
+    @staticmethod
+    def ready_event(bot: "BotApp") -> Optional[asyncio.Event]:
+        # Client._ready, set by READY: a resumed session never gets one
+        ready = getattr(bot, "_ready", None)
+        return ready if isinstance(ready, asyncio.Event) else None
+
+    @staticmethod
+    def keep_session_on_close(ws: DiscordWebSocket) -> None:
+        # Client.close closes the websocket with 1000, which ends the session: keep it resumable with 4000.
+        # Only this websocket object is patched, it is discarded by the close
+        close = ws.close
+        ws.close = lambda code=4000: close(code=4000)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def resuming(bot: "BotApp", saved: Dict):
+        """make the first connection of bot resume saved
+
+        Client.connect creates its websockets with DiscordWebSocket.from_client and has no hook for the parameters:
+        the classmethod is replaced until this bot's first connection, other clients of the process pass through.
+        """
+        original = DiscordWebSocket.__dict__["from_client"]
+
+        def restore() -> None:
+            if DiscordWebSocket.__dict__.get("from_client") is patched:
+                DiscordWebSocket.from_client = original
+
+        async def from_client(cls, client, **params):
+            # only the first connection, the later ones are discord.py's own reconnects
+            if client is bot and params.get("initial"):
+                restore()
+                log.info("Resuming gateway session %s at sequence %s", saved["session_id"], saved["sequence"])
+                params.update(
+                    session=saved["session_id"],
+                    sequence=saved["sequence"],
+                    gateway=yarl.URL(saved["resume_url"]),
+                    resume=True,
+                )
+            return await original.__func__(cls, client, **params)
+
+        patched = classmethod(from_client)
+        DiscordWebSocket.from_client = patched
+        try:
+            yield
+        finally:
+            restore()
+
+    @staticmethod
+    def add_guild(bot: "BotApp", guild: discord.Guild, channels, member: discord.Member) -> None:
+        for channel in channels:
+            guild._add_channel(channel)
+        guild._add_member(member)
+        bot._connection._add_guild(guild)
+
+
+class Lifecycle:
+    def __init__(
+        self,
+        bot: "BotApp",
+        *,
+        drain_timeout: float = 10.0,
+        session_path: Optional[Path] = None,
+        resume: bool = False,
+        resume_max_age: float = 60.0,
+    ) -> None:
+        self.bot = bot
+        self.drain_timeout = drain_timeout
+        self.session_path = session_path or _project_root() / "data" / "session.json"
+        self.resume = resume
+        if resume:
+            reason = resume_unsupported()
+            if reason is not None:
+                log.warning("Gateway session resume disabled: %s", reason)
+                self.resume = False
+        self.resume_max_age = resume_max_age
+        self.draining = False
+        self.in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._shutdown: Optional[asyncio.Task] = None
+        self._jobs: Set[asyncio.Task] = set()
+        # left by the previous process, see load_session
+        self.previous_shutdown: Optional[float] = None
+        self._saved_session: Optional[Dict] = None
+
+    # --- commands ---
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        """CommandTree.interaction_check, refuses new commands once the shutdown started"""
+        if not self.draining:
+            return True
+        try:
+            await interaction.response.send_message(DRAINING_MESSAGE, ephemeral=True)
+        except discord.HTTPException:
+            pass
+        return False
+
+    def track(self, callback: Callable, command: app_commands.Command, feature_info: Dict) -> Callable:
+        """command wrapper counting the running handlers, so the shutdown can wait for them"""
+
+        @functools.wraps(callback)
+        async def wrapper(*args, **kwargs):
+            self.in_flight += 1
+            self._idle.clear()
+            try:
+                return await callback(*args, **kwargs)
+            finally:
+                self.in_flight -= 1
+                if not self.in_flight:
+                    self._idle.set()
+
+        return wrapper
+
+    def spawn(self, job: Awaitable, *, name: str) -> asyncio.Task:
+        """run work a handler starts but does not wait for (a long broadcast), outside of its execution timeout
+
+        The shutdown waits for the job like for a running handler, then cancels it: the job catches CancelledError to
+        report its partial result.
+        """
+        task = asyncio.create_task(job, name=name)
+        self._jobs.add(task)
+        task.add_done_callback(self._job_done)
+        return task
+
+    def _job_done(self, task: asyncio.Task) -> None:
+        self._jobs.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log.error("Background job %s failed", task.get_name(), exc_info=task.exception())
+
+    async def _drain(self) -> None:
+        await self._idle.wait()
+        while self._jobs:
+            await asyncio.wait(set(self._jobs))
+
+    # --- shutdown ---
+
+    def install_signal_handlers(self) -> None:
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(signum, self.request_shutdown, signum.name)
+            except (NotImplementedError, RuntimeError):
+                log.debug("No %s handler on this platform, shutdown will not drain", signum.name)
+
+    def request_shutdown(self, reason: str = "requested") -> asyncio.Task:
+        """start the shutdown once, later calls return the same task"""
+        if self._shutdown is None:
+            self._shutdown = asyncio.create_task(self._run_shutdown(reason), name="shutdown")
+        return self._shutdown
+
+    async def _run_shutdown(self, reason: str) -> None:
+        bot = self.bot
+        start = time.monotonic()
+        log.info(
+            "Shutting down (%s), waiting for %d running command(s) and %d job(s)",
+            reason,
+            self.in_flight,
+            len(self._jobs),
+        )
+        self.draining = True
+        try:
+            await asyncio.wait_for(self._drain(), timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            log.warning(
+                "%d command(s) and %d job(s) still running after %.1f s, stopping anyway",
+                self.in_flight,
+                len(self._jobs),
+                self.drain_timeout,
+            )
+        if self._jobs:
+            jobs = set(self._jobs)
+            for job in jobs:
+                job.cancel()
+            # before the outbound dispatcher closes, so their last report still goes out
+            await asyncio.wait(jobs, timeout=JOB_CANCEL_TIMEOUT)
+
+        if bot.reloader is not None:
+            bot.reloader.stop()
+        if bot.outbound is not None:
+            await bot.outbound.close(timeout=max(self.drain_timeout - (time.monotonic() - start), 1.0))
+        if bot.store is not None:
+            await bot.store.flush()
+
+        if self.resume and bot.ws is not None and not bot.shard_count and self._save_session(bot.ws):
+            _ResumeAdapter.keep_session_on_close(bot.ws)
+        await bot.close()
+        log.info("Shutdown done in %.2f s", time.monotonic() - start)
+
+    def _save_session(self, ws: DiscordWebSocket) -> bool:
+        if not ws.session_id or ws.sequence is None:
+            return False
+        data = {
+            "saved_at": time.time(),
+            "application_id": self.bot.application_id,
+            "session_id": ws.session_id,
+            "sequence": ws.sequence,
+            "resume_url": str(ws.gateway),
+        }
+        try:
+            self.session_path.parent.mkdir(parents=True, exist_ok=True)
+            self.session_path.write_text(json.dumps(data), encoding="utf-8")
+        except OSError as e:
+            log.error("Failed to save the gateway session to %s: %s", self.session_path, e)
+            return False
+        log.info("Saved gateway session %s at sequence %s", ws.session_id, ws.sequence)
+        return True
+
+    # --- startup ---
+
+    def load_session(self) -> None:
+        """read, then delete, the session file of the previous process: a session is resumed once at most"""
+        try:
+            data = json.loads(self.session_path.read_text(encoding="utf-8"))
+            self.session_path.unlink()
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            log.warning("Ignoring unreadable session file %s: %s", self.session_path, e)
+            return
+        self.previous_shutdown = data.get("saved_at", 0.0)
+        age = time.time() - self.previous_shutdown
+        if not self.resume or self.bot.shard_count:
+            return
+        if age > self.resume_max_age:
+            log.info("Previous gateway session is %.0f s old, identifying instead of resuming", age)
+            return
+        self._saved_session = data
+
+    async def connect(self, connect: Callable, *, reconnect: bool) -> None:
+        """run Client.connect, its first websocket resuming the saved session if there is one"""
+        saved, self._saved_session = self._saved_session, None
+        if saved is None or saved.get("application_id") != self.bot.application_id:
+            return await connect(reconnect=reconnect)
+        if _ResumeAdapter.ready_event(self.bot) is None:
+            # set by rehydrate, a resumed session never gets the READY that sets it
+            log.warning("Client._ready is missing in discord.py %s, identifying instead of resuming", discord.__version__)
+            return await connect(reconnect=reconnect)
+        with _ResumeAdapter.resuming(self.bot, saved):
+            await connect(reconnect=reconnect)
+
+    async def rehydrate(self) -> None:
+        """fill the guild cache after a RESUME in a fresh process, which received no GUILD_CREATE
+
+        Only reached after a resume, which resume_unsupported allowed for the installed discord.py.
+        """
+        bot = self.bot
+        for scope in bot.guild_scopes:
+            try:
+                guild = await bot.fetch_guild(scope.id)
+                channels = await guild.fetch_channels()
+                member = await guild.fetch_member(bot.user.id)
+            except discord.HTTPException as e:
+                log.warning("Failed to fetch guild %s after resuming: %s", scope.id, e)
+                continue
+            _ResumeAdapter.add_guild(bot, guild, channels, member)
+        _ResumeAdapter.ready_event(bot).set()
+
+    def report_restart(self, how: str) -> None:
+        """log the time from the previous process' shutdown to this one being ready"""
+        if self.previous_shutdown is not None:
+            log.info("Restart to ready: %.2f s (%s)", time.time() - self.previous_shutdown, how)
+            self.previous_shutdown = None
+
+
+def lifecycle_from_config(bot: "BotApp", lifecycle_config: Dict) -> Lifecycle:
+    """build the Lifecycle described by the [lifecycle] config table"""
+    path = Path(lifecycle_config.get("session_path", "data/session.json"))
+    if not path.is_absolute():
+        path = _project_root() / path
+    return Lifecycle(
+        bot,
+        drain_timeout=lifecycle_config.get("drain_timeout", 10.0),
+        session_path=path,
+        resume=lifecycle_config.get("resume", False),
+        resume_max_age=lifecycle_config.get("resume_max_age", 60.0),
+    )
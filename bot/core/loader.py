@@ -1,114 +1,430 @@
 from __future__ import annotations
 
+import ast
+import graphlib
 import importlib
+import importlib.util
+import inspect
 import logging
-from typing import Dict, List, Tuple
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from types import ModuleType
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from discord import app_commands
+
+from ..core.config import _project_root, feature_config
+from ..core.settings import SettingsError, SettingsSchema
+from ..core.storage import Store
 
 log = logging.getLogger(__name__)
 
+# wrapper(callback, command, feature_info) -> new callback, applied to every command a feature registers
+CommandWrapper = Callable[[Callable, app_commands.Command, Dict], Callable]
+
+PARAMS_NEEDED: List[str] = ["slug", "name", "description", "version", "author", "requires_config", "permissions"]
+
+
+@dataclass
+class FeatureReport:
+    """per-feature load report, times are in seconds"""
+
+    slug: str
+    import_time: float = 0.0
+    register_time: float = 0.0
+    commands: Tuple[str, ...] = ()
+
 
 def _command_qualified_keys(tree) -> set[str]:
     return {cmd.name for cmd in tree.get_commands()}
 
 
-def load_features(tree, config: Dict) -> Tuple:
-    """Dynamically load and register features based on config, return dict of loaded modules and dict of failed ones with error messages
+def _declared(feature_info: Dict, key: str) -> Optional[Tuple[str, ...]]:
+    """an optional list of names of FEATURE, None if absent, ValueError if it is not a list of strings"""
+    names = feature_info.get(key)
+    if names is None:
+        return None
+    if isinstance(names, str) or not all(isinstance(name, str) for name in names):
+        raise ValueError(f"{key} must be a list of strings")
+    return tuple(names)
+
+
+def plan_features(
+    manifests: Dict[str, Dict], *, taken: Iterable[str] = (), available: Iterable[str] = ()
+) -> Tuple[List[List[str]], Dict[str, str]]:
+    """Order features from the depends_on and provides of their FEATURE dictionary, without importing or registering
+
+    manifests: slug -> FEATURE, in enabled order, which breaks the ties
+    taken: command names already in the tree, a feature providing one of them conflicts
+    available: features loaded earlier, dependencies on them are satisfied
+
+    Returns the batches of the topological order, a batch only depending on the previous ones, and the features
+    refused with their error: invalid declarations, a command name provided by an earlier feature or already taken,
+    a dependency missing, refused or part of a cycle.
+    """
+    failed: Dict[str, str] = {}
+    owners: Dict[str, str] = {name: "core" for name in taken}
+    depends_on: Dict[str, Tuple[str, ...]] = {}
+    for slug, feature_info in manifests.items():
+        try:
+            depends_on[slug] = _declared(feature_info, "depends_on") or ()
+            provides = _declared(feature_info, "provides") or ()
+        except ValueError as e:
+            failed[slug] = "Invalid FEATURE: " + str(e)
+            continue
+        conflicts = [f"{name} ({owners[name]})" for name in provides if name in owners]
+        if conflicts:
+            failed[slug] = "Command name conflict: " + ", ".join(conflicts)
+            continue
+        owners.update((name, slug) for name in provides)
+
+    available = set(available)
+    while True:
+        # a refusal refuses the features depending on it, up to a fixed point
+        changed = True
+        while changed:
+            changed = False
+            for slug, dependencies in depends_on.items():
+                if slug in failed:
+                    continue
+                missing = [name for name in dependencies if name not in manifests and name not in available]
+                refused = [name for name in dependencies if name in failed]
+                if missing or refused:
+                    failed[slug] = (
+                        "Missing dependency: " + ", ".join(missing)
+                        if missing
+                        else "Dependency failed: " + ", ".join(refused)
+                    )
+                    changed = True
+
+        sorter = graphlib.TopologicalSorter(
+            {
+                slug: [name for name in dependencies if name in manifests]
+                for slug, dependencies in depends_on.items()
+                if slug not in failed
+            }
+        )
+        try:
+            sorter.prepare()
+        except graphlib.CycleError as e:
+            cycle = e.args[1]
+            for slug in cycle:
+                failed[slug] = "Dependency cycle: " + " -> ".join(cycle)
+            continue
+        break
+
+    position = {slug: index for index, slug in enumerate(manifests)}
+    batches = []
+    while sorter.is_active():
+        batch = sorted(sorter.get_ready(), key=position.__getitem__)
+        batches.append(batch)
+        sorter.done(*batch)
+    for slug, error in failed.items():
+        log.error("Feature %s refused before loading: %s", slug, error)
+    return batches, failed
+
+
+def iter_commands(commands: Iterable) -> Iterator[app_commands.Command]:
+    """yield every slash command, walking into groups"""
+    for cmd in commands:
+        if isinstance(cmd, app_commands.Group):
+            yield from iter_commands(cmd.commands)
+        elif isinstance(cmd, app_commands.Command):
+            yield cmd
+
+
+def wrap_commands(commands: Iterable, wrappers: Sequence[CommandWrapper], feature_info: Dict) -> None:
+    """apply wrappers to the callbacks of commands, the last wrapper being the outermost"""
+    for cmd in iter_commands(commands):
+        for wrapper in wrappers:
+            cmd._callback = wrapper(cmd._callback, cmd, feature_info)
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Return a module whose body only executes on first attribute access
+
+    Meant for heavy feature internals used by command handlers, e.g. at the top of feature.py:
+        service = lazy_import("features.example.service")
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def read_manifest(slug: str) -> Dict:
+    """Read the FEATURE dictionary of features/{slug}/feature.py from its source without importing it
+
+    Raises ValueError if the file has no FEATURE assignment made of literals only.
+    """
+    path = _project_root() / "features" / slug / "feature.py"
+    tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+    for node in tree.body:
+        if isinstance(node, ast.Assign):
+            targets = node.targets
+        elif isinstance(node, ast.AnnAssign) and node.value is not None:
+            targets = [node.target]
+        else:
+            continue
+        if any(isinstance(target, ast.Name) and target.id == "FEATURE" for target in targets):
+            return ast.literal_eval(node.value)
+    raise ValueError(f"No static FEATURE dictionary in {path}")
+
+
+def _check_feature_info(module_path: str, slug: str, feature_info, features_config: Dict) -> Optional[str]:
+    """validate a FEATURE dictionary, return an error message or None"""
+    if not isinstance(feature_info, dict):
+        log.error("Feature module %s FEATURE is not a dictionary.", module_path)
+        return "FEATURE is not a dictionary"
+
+    if not feature_info.get("slug"):
+        log.error("Feature module %s FEATURE dictionary missing slug.", module_path)
+        return "FEATURE missing slug"
+
+    if not all(param in feature_info for param in PARAMS_NEEDED):
+        missing_params = [param for param in PARAMS_NEEDED if param not in feature_info]
+        log.error("Feature module %s FEATURE dictionary missing parameters: %s.", module_path, ", ".join(missing_params))
+        return "Missing parameters: " + ", ".join(missing_params)
+
+    if feature_info.get("slug") != slug:
+        log.error("Feature module %s slug mismatch: expected %s, got %s.", module_path, slug, feature_info.get("slug"))
+        return "Slug mismatch"
+
+    if feature_info.get("requires_config", True) and not features_config.get(slug, {}):
+        log.error("Feature module %s requires configuration but none was provided.", module_path)
+        return "Missing required configuration"
+
+    return None
+
+
+def _wants_store(register: Callable) -> bool:
+    """register(tree, config, store) rather than register(tree, config)"""
+    try:
+        return len(inspect.signature(register).parameters) >= 3
+    except (TypeError, ValueError):
+        return False
+
+
+def _timed_import(module_path: str) -> Tuple[ModuleType, float]:
+    start = time.perf_counter()
+    module = importlib.import_module(module_path)
+    return module, time.perf_counter() - start
+
+
+def _check_module(module_path: str, slug: str, module: ModuleType, features_config: Dict) -> Optional[str]:
+    """validate an imported feature module, return an error message or None"""
+    if not hasattr(module, "FEATURE"):
+        log.error("Feature module %s is missing FEATURE dictionary.", module_path)
+        return "Missing FEATURE dictionary"
+
+    if not hasattr(module, "register"):
+        log.error("Feature module %s is missing register function.", module_path)
+        return "Missing register function"
+
+    return _check_feature_info(module_path, slug, module.FEATURE, features_config)
+
+
+def load_features(
+    tree,
+    config: Dict,
+    *,
+    wrappers: Sequence[CommandWrapper] = (),
+    store: Optional[Store] = None,
+    available: Iterable[str] = (),
+) -> Tuple:
+    """Dynamically load and register features based on config, return dict of loaded modules, dict of failed ones with error messages and per-feature reports
 
     Each feature module must be located at features/{slug}/feature.py and define:
     - a FEATURE dictionary with keys: slug, name, description, version, author, requires_config (bool), permissions (list of str)
+      and optionally depends_on (slugs of the features to register first) and provides (the names of the top-level
+      commands it registers)
     - a register(tree, config) function that registers the feature's commands to the provided tree using the provided config dict
+      (a FeatureConfig: the [features.{slug}] section, with config.for_guild(guild_id) for per-guild overlays)
+      or register(tree, config, store) to also receive store.namespace(slug), its view of the shared Store (None without one)
+    and optionally a SETTINGS schema (see bot.core.settings), validated before register is called, so that handlers
+    read config.settings_for(guild_id) attributes instead of dict lookups
+
+    Features are registered in the topological order of their depends_on, ties broken by enabled order (see
+    plan_features). Name conflicts between provides declarations, missing dependencies and cycles are refused before
+    anything is registered; a feature whose dependency fails to load is refused too. Features declaring provides must
+    register exactly those commands; for the others, conflicts are found by comparing the tree around register.
+
+    With `parallel = true` in the [loader] config table, every FEATURE dictionary is first read statically from its source
+    (see read_manifest) so invalid features are rejected and the order planned without importing anything, then the
+    modules of each batch of the order are imported together in a thread pool of `max_workers` threads. Without it,
+    every module is imported in enabled order before planning. Registration always happens on the calling thread,
+    one feature at a time: register mutates the shared command tree.
 
     Parameters:
         tree: the app_commands.CommandTree to register commands to
         config: the full configuration dict loaded from the config file, used to pass feature-specific config to each module
+        wrappers: CommandWrapper functions applied to the callback of every command registered by a feature
+        store: the Store whose namespaces are given to features taking a store parameter
+        available: slugs of features already loaded, satisfying dependencies (when reloading a single feature)
 
     Returns:
         loaded: dict mapping feature slug to the imported module object for successfully loaded features
         failed: dict mapping feature slug to error message for features that failed to load
+        reports: dict mapping feature slug to its FeatureReport (import and register timings, registered commands)
     """
-    params_needed: List[str] = ["slug", "name", "description", "version", "author", "requires_config", "permissions"]
     enabled: List[str] = config["enabled_features"]
     features_config: Dict = config.get("features", {})
+    loader_config: Dict = config.get("loader", {})
 
     loaded: Dict[str, object] = {}
     failed: Dict[str, str] = {}
+    reports: Dict[str, FeatureReport] = {slug: FeatureReport(slug=slug) for slug in enabled}
+    available = set(available)
 
-    for slug in enabled:
-        module_path = f"features.{slug}.feature"
-        try:
-            module = importlib.import_module(module_path)
-        except Exception as e:
-            failed[slug] = "ImportError: " + str(e)
-            log.error(f"Failed to import feature module {module_path}: {e}")
-            continue
-
-        if not hasattr(module, "FEATURE"):
-            failed[slug] = "Missing FEATURE dictionary"
-            log.error(f"Feature module {module_path} is missing FEATURE dictionary.")
-            continue
-
-        if not hasattr(module, "register"):
-            failed[slug] = "Missing register function"
-            log.error(f"Feature module {module_path} is missing register function.")
-            continue
-
-        feature_info: Dict = module.FEATURE
+    manifests: Dict[str, Dict] = {}
+    imported: Dict[str, ModuleType] = {}
+    parallel = loader_config.get("parallel", False)
+    if parallel:
+        for slug in enabled:
+            module_path = f"features.{slug}.feature"
+            try:
+                manifest = read_manifest(slug)
+            except Exception as e:
+                failed[slug] = "ManifestError: " + str(e)
+                log.error("Failed to read feature manifest of %s: %s", module_path, e)
+                continue
+            error = _check_feature_info(module_path, slug, manifest, features_config)
+            if error:
+                failed[slug] = error
+                continue
+            manifests[slug] = manifest
+    else:
+        for slug in enabled:
+            module_path = f"features.{slug}.feature"
+            try:
+                module, reports[slug].import_time = _timed_import(module_path)
+            except Exception as e:
+                failed[slug] = "ImportError: " + str(e)
+                log.error("Failed to import feature module %s: %s", module_path, e)
+                continue
+            error = _check_module(module_path, slug, module, features_config)
+            if error:
+                failed[slug] = error
+                continue
+            imported[slug] = module
+            manifests[slug] = module.FEATURE
 
-        if not isinstance(feature_info, dict):
-            failed[slug] = "FEATURE is not a dictionary"
-            log.error(f"Feature module {module_path} FEATURE is not a dictionary.")
-            continue
+    batches, refused = plan_features(manifests, taken=_command_qualified_keys(tree), available=available)
+    failed.update(refused)
 
-        if not feature_info.get("slug"):
-            failed[slug] = "FEATURE missing slug"
-            log.error(f"Feature module {module_path} FEATURE dictionary missing slug.")
-            continue
+    def dependency_failed(slug: str) -> bool:
+        refused = [name for name in manifests[slug].get("depends_on", ()) if name in failed]
+        if refused:
+            failed[slug] = "Dependency failed: " + ", ".join(refused)
+            log.error("Feature %s not loaded, its dependencies failed: %s", slug, ", ".join(refused))
+        return bool(refused)
 
-        if not all(param in feature_info for param in params_needed):
-            missing_params = [param for param in params_needed if param not in feature_info]
-            failed[slug] = "Missing parameters: " + ", ".join(missing_params)
-            log.error(
-                f"Feature module {module_path} FEATURE dictionary missing parameters: {', '.join(missing_params)}."
-            )
-            continue
+    if parallel:
+        with ThreadPoolExecutor(max_workers=loader_config.get("max_workers", 8)) as pool:
+            # a batch only depends on the previous ones: its modules are imported together, after theirs
+            for batch in batches:
+                futures = {
+                    slug: pool.submit(_timed_import, f"features.{slug}.feature")
+                    for slug in batch
+                    if not dependency_failed(slug)
+                }
+                for slug, future in futures.items():
+                    module_path = f"features.{slug}.feature"
+                    try:
+                        module, reports[slug].import_time = future.result()
+                    except Exception as e:
+                        failed[slug] = "ImportError: " + str(e)
+                        log.error("Failed to import feature module %s: %s", module_path, e)
+                        continue
+                    error = _check_module(module_path, slug, module, features_config)
+                    if error:
+                        failed[slug] = error
+                        continue
+                    imported[slug] = module
 
-        if feature_info.get("slug") != slug:
-            failed[slug] = "Slug mismatch"
-            log.error(f"Feature module {module_path} slug mismatch: expected {slug}, got {feature_info.get('slug')}.")
+    # top-level command names in the tree, kept up to date instead of listing the tree around every register
+    names = _command_qualified_keys(tree)
+    for slug in (slug for batch in batches for slug in batch):
+        if slug in failed or dependency_failed(slug):
             continue
+        module_path = f"features.{slug}.feature"
+        module = imported[slug]
 
-        feature_cfg: Dict = features_config.get(slug, {})
-
-        if feature_info.get("requires_config", True) and not feature_cfg:
-            failed[slug] = "Missing required configuration"
-            log.error(f"Feature module {module_path} requires configuration but none was provided.")
-            continue
+        feature_cfg: Dict = feature_config(config, slug)
+        if hasattr(module, "SETTINGS"):
+            try:
+                feature_cfg.bind(SettingsSchema(slug, module.SETTINGS))
+            except SettingsError as e:
+                failed[slug] = "SettingsError: " + str(e)
+                log.error("Feature module %s has invalid settings: %s", module_path, e)
+                continue
 
+        provides = _declared(module.FEATURE, "provides")
         try:
+            before_cmds = {cmd.name: cmd for cmd in tree.get_commands()} if provides is None else None
+            start = time.perf_counter()
+            if _wants_store(module.register):
+                module.register(tree, feature_cfg, store.namespace(slug) if store is not None else None)
+            else:
+                module.register(tree, feature_cfg)
+            reports[slug].register_time = time.perf_counter() - start
 
-            before = _command_qualified_keys(tree)
-            log.debug(f"Commands before loading feature {slug}: {before}")
-            before_cmds = {cmd.name: cmd for cmd in tree.get_commands()}
-            module.register(tree, feature_cfg)
-            after_cmds = {cmd.name: cmd for cmd in tree.get_commands()}
-            duplicates = {
-                name for name, cmd in after_cmds.items() if name in before_cmds and before_cmds[name] is not cmd
-            }
-            if duplicates:
-                failed[slug] = "Command name conflict: " + ", ".join(sorted(duplicates))
-                log.error(f"Feature module {module_path} command name conflict: {', '.join(sorted(duplicates))}.")
-
-                for cmd_name in duplicates:
-                    try:
+            if provides is not None:
+                # names checked by plan_features: only look them up, the tree is listed again only if they lied
+                commands = [tree.get_command(name) for name in provides]
+                if None in commands or len(tree.get_commands()) != len(names) + len(provides):
+                    added = _command_qualified_keys(tree) - names
+                    failed[slug] = "Registered commands differ from provides: " + (", ".join(sorted(added)) or "none")
+                    log.error(
+                        "Feature module %s registered %s, not its provides %s.",
+                        module_path,
+                        ", ".join(sorted(added)) or "nothing",
+                        ", ".join(provides),
+                    )
+                    for cmd_name in added:
                         tree.remove_command(cmd_name)
-                    except Exception as e:
-                        log.error(f"Failed to remove command {cmd_name} after conflict in feature {slug}: {e}")
-                continue
+                    continue
+                reports[slug].commands = tuple(sorted(provides))
+                wrap_commands(commands, wrappers, module.FEATURE)
+            else:
+                after_cmds = {cmd.name: cmd for cmd in tree.get_commands()}
+                duplicates = {
+                    name for name, cmd in after_cmds.items() if name in before_cmds and before_cmds[name] is not cmd
+                }
+                if duplicates:
+                    failed[slug] = "Command name conflict: " + ", ".join(sorted(duplicates))
+                    log.error(
+                        "Feature module %s command name conflict: %s.", module_path, ", ".join(sorted(duplicates))
+                    )
 
+                    for cmd_name in duplicates:
+                        try:
+                            tree.remove_command(cmd_name)
+                        except Exception as e:
+                            log.error("Failed to remove command %s after conflict in feature %s: %s", cmd_name, slug, e)
+                    continue
+
+                reports[slug].commands = tuple(sorted(name for name in after_cmds if name not in before_cmds))
+                wrap_commands((after_cmds[name] for name in reports[slug].commands), wrappers, module.FEATURE)
+            names.update(reports[slug].commands)
             loaded[slug] = module
-            log.info(f"Successfully loaded feature module {module_path}.")
+            log.info(
+                "Successfully loaded feature module %s (import %.1f ms, register %.1f ms).",
+                module_path,
+                reports[slug].import_time * 1000,
+                reports[slug].register_time * 1000,
+            )
         except Exception as e:
             failed[slug] = "RegistrationError: " + str(e)
-            log.error(f"Failed to register feature module {module_path}: {e}")
+            log.error("Failed to register feature module %s: %s", module_path, e)
 
-    return loaded, failed
+    return loaded, failed, reports
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+from datetime import date, datetime, time, timedelta
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from typing import Optional
+
+TEXT_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+
+_EXCEPTION_FORMATTER = logging.Formatter()
+
+
+class JsonFormatter(logging.Formatter):
+    """one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exc_info"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False)
+
+
+class DailyFileHandler(logging.FileHandler):
+    """write to <logs_dir>/<prefix>_<YYYY-MM-DD>.log, switching to a new file at local midnight
+
+    A file reaching `max_bytes` is continued in <prefix>_<YYYY-MM-DD>.1.log, .2.log... (0 disables the cap). Only
+    the files of the `backup_count` most recent days are kept.
+    """
+
+    def __init__(self, logs_dir: Path, prefix: str = "bot", backup_count: int = 14, max_bytes: int = 5_000_000) -> None:
+        self.logs_dir = logs_dir
+        self.prefix = prefix
+        self.backup_count = backup_count
+        self.max_bytes = max_bytes
+        self._part = 0
+        super().__init__(self._path_for(date.today()), encoding="utf-8", delay=True)
+        self._rollover_at = self._next_midnight()
+
+    def _path_for(self, day: date, part: int = 0) -> Path:
+        suffix = f".{part}" if part else ""
+        return self.logs_dir / f"{self.prefix}_{day.isoformat()}{suffix}.log"
+
+    @staticmethod
+    def _next_midnight() -> float:
+        return datetime.combine(date.today() + timedelta(days=1), time.min).timestamp()
+
+    def _switch(self, part: int) -> None:
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        self._part = part
+        self.baseFilename = os.path.abspath(self._path_for(date.today(), part))
+
+    def _rollover(self) -> None:
+        self._switch(0)
+        self._rollover_at = self._next_midnight()
+        if self.backup_count > 0:
+            days = sorted({path.name[len(self.prefix) + 1 :][:10] for path in self._files()})
+            keep = set(days[-self.backup_count :])
+            for path in self._files():
+                if path.name[len(self.prefix) + 1 :][:10] not in keep:
+                    try:
+                        path.unlink()
+                    except OSError:
+                        pass
+
+    def _files(self):
+        return self.logs_dir.glob(f"{self.prefix}_????-??-??*.log")
+
+    def _full(self, record: logging.LogRecord) -> bool:
+        if not self.max_bytes:
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        self.stream.seek(0, 2)  # append mode does not report the end of an existing file before the first write
+        return self.stream.tell() > 0 and self.stream.tell() + len(self.format(record)) + 1 > self.max_bytes
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.created >= self._rollover_at:
+            self._rollover()
+        # a restart during the day may find the first parts already full
+        while self._full(record):
+            self._switch(self._part + 1)
+        super().emit(record)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler on a bounded queue that drops records instead of blocking when the writer thread lags behind
+
+    The number of dropped records is kept in `dropped` and reported in the log as soon as the queue has room again.
+    """
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._reported = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """like QueueHandler.prepare, but the traceback is kept apart from the message, in exc_text
+
+        The formatters of the writer thread then place it: after the message in text, in its own key in JSON.
+        """
+        record = copy.copy(record)
+        record.message = record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = _EXCEPTION_FORMATTER.formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self.dropped != self._reported:
+            lost = self.dropped - self._reported
+            self._reported = self.dropped
+            notice = logging.LogRecord(
+                __name__, logging.WARNING, __file__, 0, "Logging queue full, dropped %d records", (lost,), None
+            )
+            try:
+                self.queue.put_nowait(notice)
+            except queue.Full:
+                pass
+
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[DroppingQueueHandler] = None
+
+
+def setup_logging(
+    level: str = "INFO",
+    *,
+    fmt: str = "text",
+    queue_size: int = 10_000,
+    backup_count: int = 14,
+    max_bytes: int = 5_000_000,
+) -> None:
+    """Log to stdout and to a daily file from a background thread
+
+    The root logger only gets a DroppingQueueHandler, the stream and file writes happen in a QueueListener thread.
+    fmt is "text" or "json".
+    """
+    global _listener, _queue_handler
+    stop_logging()
+
+    logs_dir = Path(__file__).resolve().parent.parent.parent / "logs"
+    logs_dir.mkdir(exist_ok=True)
+
+    formatter = JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT)
+
+    # Redirect stderr to stdout to fix Railway logging issues
+    sys.stderr = sys.stdout
+
+    sh = logging.StreamHandler(sys.stdout)
+    sh.setFormatter(formatter)
+
+    fh = DailyFileHandler(logs_dir, backup_count=backup_count, max_bytes=max_bytes)
+    fh.setFormatter(formatter)
+
+    _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    _listener = QueueListener(_queue_handler.queue, sh, fh, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, level.upper(), logging.INFO))
+    root.handlers.clear()
+    root.addHandler(_queue_handler)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """flush the queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def dropped_records() -> int:
+    return _queue_handler.dropped if _queue_handler is not None else 0
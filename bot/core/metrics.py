@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import functools
+import logging
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import discord
+from discord import app_commands
+
+from ..core.checks import is_staff, permission_cache_stats
+
+log = logging.getLogger(__name__)
+
+# seconds
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """cumulative-bucket histogram, quantiles are interpolated inside buckets like Prometheus' histogram_quantile"""
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+# the InteractionResponse methods that acknowledge an interaction
+_RESPONDING = frozenset({"send_message", "defer", "send_modal", "edit_message"})
+
+
+class _TimedResponse:
+    """stands in for interaction.response: calls on_response once, when the first acknowledgement went through"""
+
+    def __init__(self, response: discord.InteractionResponse, on_response: Callable[[], None]) -> None:
+        self._response = response
+        self._on_response: Optional[Callable[[], None]] = on_response
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._response, name)
+        if name not in _RESPONDING or self._on_response is None:
+            return attr
+
+        @functools.wraps(attr)
+        async def timed(*args, **kwargs):
+            result = await attr(*args, **kwargs)
+            if self._on_response is not None:
+                on_response, self._on_response = self._on_response, None
+                on_response()
+            return result
+
+        return timed
+
+
+class _TimedInteraction:
+    """the interaction given to instrumented handlers: the real one, except for .response"""
+
+    def __init__(self, interaction: discord.Interaction, response: _TimedResponse) -> None:
+        self._interaction = interaction
+        self.response = response
+
+    def __getattr__(self, name: str):
+        return getattr(self._interaction, name)
+
+
+class MetricsRegistry:
+    """per-command counters and latency histograms, rendered in Prometheus text format
+
+    Labels are (command qualified name, feature slug).
+    """
+
+    def __init__(self) -> None:
+        self.invocations: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.errors: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.check_failures: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.duration: Dict[Tuple[str, str], Histogram] = defaultdict(Histogram)
+        self.response: Dict[Tuple[str, str], Histogram] = defaultdict(Histogram)
+        self._features: Dict[str, str] = {}
+        self._gauges: List[Tuple[str, str, str, Callable[[], Dict[Tuple[Tuple[str, str], ...], float]]]] = []
+        self._stats_fields: List[Callable[[], Tuple[str, str]]] = []
+        self._histograms: List[Tuple[str, str, Callable[[], Dict[Tuple[Tuple[str, str], ...], Histogram]]]] = []
+        self.add_gauge(
+            "pybot_permission_cache_hits_total",
+            "Check predicates answered from the per-interaction permission cache.",
+            lambda: {(("command", command),): stats["hits"] for command, stats in permission_cache_stats().items()},
+            kind="counter",
+        )
+        self.add_gauge(
+            "pybot_permission_cache_misses_total",
+            "Check predicates that computed and cached a permission value.",
+            lambda: {(("command", command),): stats["misses"] for command, stats in permission_cache_stats().items()},
+            kind="counter",
+        )
+
+    def _labels(self, command: Optional[app_commands.Command]) -> Tuple[str, str]:
+        name = command.qualified_name if command else "?"
+        return name, self._features.get(name, "core")
+
+    def add_gauge(
+        self,
+        name: str,
+        help_text: str,
+        collect: Callable[[], Dict[Tuple[Tuple[str, str], ...], float]],
+        *,
+        kind: str = "gauge",
+    ) -> None:
+        """register a gauge (or a counter with kind="counter") computed at scrape time
+
+        collect returns {((label, value), ...): value}
+        """
+        self._gauges.append((name, help_text, kind, collect))
+
+    def add_histogram(
+        self, name: str, help_text: str, collect: Callable[[], Dict[Tuple[Tuple[str, str], ...], Histogram]]
+    ) -> None:
+        """register histograms owned by another component, collect returns {((label, value), ...): Histogram}"""
+        self._histograms.append((name, help_text, collect))
+
+    def add_stats_field(self, collect: Callable[[], Tuple[str, str]]) -> None:
+        """add a field to the /stats embed, collect returns (name, value) when /stats is used"""
+        self._stats_fields.append(collect)
+
+    # --- recording ---
+
+    def instrument(self, callback: Callable, command: app_commands.Command, feature_info: Dict) -> Callable:
+        """command wrapper for load_features: count invocations and errors, time the handler and the first response"""
+        self._features[command.qualified_name] = feature_info.get("slug", "?")
+        labels = self._labels(command)
+
+        @functools.wraps(callback)
+        async def wrapper(*args, **kwargs):
+            interaction: discord.Interaction = args[-1]
+            self.invocations[labels] += 1
+            # the inner wrappers and the handler respond through the proxy, which times the first acknowledgement
+            response = _TimedResponse(
+                interaction.response, functools.partial(self.record_response, interaction, labels)
+            )
+            start = time.perf_counter()
+            try:
+                return await callback(*args[:-1], _TimedInteraction(interaction, response), **kwargs)
+            except Exception:
+                self.errors[labels] += 1
+                raise
+            finally:
+                self.duration[labels].observe(time.perf_counter() - start)
+
+        return wrapper
+
+    def record_response(self, interaction: discord.Interaction, labels: Optional[Tuple[str, str]] = None) -> None:
+        """time from interaction creation (snowflake timestamp) to its first response: a message, a defer or a modal"""
+        elapsed = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+        self.response[labels or self._labels(interaction.command)].observe(max(elapsed, 0.0))
+
+    def record_check_failure(self, interaction: discord.Interaction) -> None:
+        self.check_failures[self._labels(interaction.command)] += 1
+
+    # --- export ---
+
+    def summary(self) -> List[Dict]:
+        """one dict per command, most used first"""
+        rows = []
+        for labels in sorted(self.invocations.keys() | self.check_failures.keys()):
+            histogram = self.duration.get(labels)
+            rows.append(
+                {
+                    "command": labels[0],
+                    "feature": labels[1],
+                    "invocations": self.invocations.get(labels, 0),
+                    "errors": self.errors.get(labels, 0),
+                    "check_failures": self.check_failures.get(labels, 0),
+                    "p50": histogram.quantile(0.5) if histogram else 0.0,
+                    "p95": histogram.quantile(0.95) if histogram else 0.0,
+                    "p99": histogram.quantile(0.99) if histogram else 0.0,
+                }
+            )
+        rows.sort(key=lambda row: row["invocations"], reverse=True)
+        return rows
+
+    @staticmethod
+    def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+        body = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+        return "{" + body + "}" if body else ""
+
+    def _counter(self, lines: List[str], name: str, help_text: str, values: Dict[Tuple[str, str], int]) -> None:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for (command, feature), value in sorted(values.items()):
+            lines.append(f"{name}{self._format_labels((('command', command), ('feature', feature)))} {value}")
+
+    def _histogram_series(self, lines: List[str], name: str, base: Tuple[Tuple[str, str], ...], histogram: Histogram) -> None:
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{name}_bucket{self._format_labels(base + (('le', le),))} {cumulative}")
+        lines.append(f"{name}_sum{self._format_labels(base)} {histogram.sum}")
+        lines.append(f"{name}_count{self._format_labels(base)} {histogram.count}")
+
+    def _histogram(self, lines: List[str], name: str, help_text: str, values: Dict[Tuple[str, str], Histogram]) -> None:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for (command, feature), histogram in sorted(values.items()):
+            self._histogram_series(lines, name, (("command", command), ("feature", feature)), histogram)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        self._counter(lines, "pybot_command_invocations_total", "Command handler invocations.", self.invocations)
+        self._counter(lines, "pybot_command_errors_total", "Command handlers that raised.", self.errors)
+        self._counter(lines, "pybot_command_check_failures_total", "Invocations rejected by a check.", self.check_failures)
+        self._histogram(lines, "pybot_command_duration_seconds", "Command handler duration.", self.duration)
+        self._histogram(
+            lines, "pybot_interaction_response_seconds", "Interaction creation to its first response.", self.response
+        )
+        for name, help_text, kind, collect in self._gauges:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            try:
+                values = collect()
+            except Exception as e:
+                log.error("Failed to collect gauge %s: %s", name, e)
+                continue
+            for labels, value in sorted(values.items()):
+                lines.append(f"{name}{self._format_labels(labels)} {value}")
+        for name, help_text, collect in self._histograms:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            try:
+                histograms = collect()
+            except Exception as e:
+                log.error("Failed to collect histogram %s: %s", name, e)
+                continue
+            for labels, histogram in sorted(histograms.items()):
+                self._histogram_series(lines, name, labels, histogram)
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """tiny asyncio HTTP server answering GET /metrics in Prometheus text format"""
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9108) -> None:
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5.0)
+            while (await asyncio.wait_for(reader.readline(), timeout=5.0)) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status, body = "200 OK", self.registry.render().encode("utf-8")
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        log.info("Metrics endpoint listening on http://%s:%d/metrics", self.host, self.port)
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+
+def register_stats_command(tree: app_commands.CommandTree, registry: MetricsRegistry) -> None:
+    """add the staff-only /stats command to the tree"""
+
+    @tree.command(name="stats", description="Statistiques d'utilisation et de latence des commandes")
+    @is_staff()
+    async def stats_command(interaction: discord.Interaction):
+        rows = registry.summary()[:15]
+        embed = discord.Embed(title="Statistiques des commandes", color=discord.Color.blurple())
+        if not rows:
+            embed.description = "Aucune commande exécutée depuis le démarrage."
+        for row in rows:
+            embed.add_field(
+                name=f"/{row['command']} ({row['feature']})",
+                value=(
+                    f"{row['invocations']} appels, {row['errors']} erreurs, {row['check_failures']} refus\n"
+                    f"p50 {row['p50'] * 1000:.0f} ms · p95 {row['p95'] * 1000:.0f} ms · p99 {row['p99'] * 1000:.0f} ms"
+                ),
+                inline=False,
+            )
+        for collect in registry._stats_fields:
+            name, value = collect()
+            embed.add_field(name=name, value=value, inline=False)
+        hits = sum(stats["hits"] for stats in permission_cache_stats().values())
+        embed.set_footer(text=f"Cache des permissions : {hits} hits")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
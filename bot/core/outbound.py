@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+import discord
+
+from ..core.metrics import Histogram, MetricsRegistry
+
+log = logging.getLogger(__name__)
+
+# lanes, served in this order
+INTERACTION = "interaction"
+BACKGROUND = "background"
+
+MAX_CONTENT = 2000  # Discord message length limit
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class OutboundQueueFull(Exception):
+    pass
+
+
+@dataclass
+class _Message:
+    """a background channel.send, may be merged with the next ones of the same channel"""
+
+    channel: discord.abc.Messageable
+    content: Optional[str]
+    kwargs: dict
+    coalesce: bool
+    future: asyncio.Future
+    enqueued: float = field(default_factory=time.perf_counter)
+
+    @property
+    def mergeable(self) -> bool:
+        # only plain text: embeds, files, views, replies... each need their own message
+        return self.coalesce and not self.kwargs and self.content is not None
+
+
+class OutboundDispatcher:
+    """single exit for the REST calls that send messages, with two priority lanes
+
+    - interaction lane (respond): interaction responses and followups. They go out immediately, never queued behind
+      background sends: each interaction has its own webhook route and a 3 second deadline.
+    - background lane (send): channel.send, run by `workers` tasks and serialized per channel, so a burst is spread
+      over the per-channel rate limits instead of piling up in the HTTP client, and one rate-limited channel holds one
+      worker at most. Plain text messages waiting for the same channel are merged into one send (up to 2000 characters).
+
+    The interaction lane has priority: while interaction calls are in flight, at most `background_while_responding`
+    background sends run, the other workers wait before starting their next send. The global REST rate limit and the
+    HTTP connections are left to the responses, a broadcast does not delay them by more than that many sends.
+
+    Queue depth, wait time before the call starts, sends and merged messages are exported through the metrics registry.
+    """
+
+    def __init__(self, *, workers: int = 4, max_pending: int = 10_000, background_while_responding: int = 1) -> None:
+        self.workers = max(workers, 1)
+        self.max_pending = max_pending
+        self.background_while_responding = max(background_while_responding, 0)
+        self._responding = 0  # interaction calls in flight
+        self._no_responses = asyncio.Event()  # set while no interaction call is in flight
+        self._no_responses.set()
+        self._sending = 0  # background sends in flight
+        self._channels: "OrderedDict[int, Deque[_Message]]" = OrderedDict()  # channel id -> pending messages
+        self._ready: Deque[int] = deque()  # channels with pending messages and no send in flight
+        self._busy: set = set()
+        self._pending_messages = 0
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._closing = False
+        self.wait_time = Histogram(WAIT_BUCKETS)  # background lane, enqueued to send started
+        self.calls: Dict[str, int] = {INTERACTION: 0, BACKGROUND: 0}
+        self.merged = 0
+        self.yielded = 0  # background sends held back for interaction calls
+
+    # --- submission ---
+
+    async def respond(self, fn: Callable[..., Awaitable], *args, **kwargs) -> Any:
+        """run fn(*args, **kwargs), e.g. interaction.response.send_message, in the interaction lane"""
+        self.calls[INTERACTION] += 1
+        self._responding += 1
+        self._no_responses.clear()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            self._responding -= 1
+            if not self._responding:
+                self._no_responses.set()
+
+    async def send(
+        self, channel: discord.abc.Messageable, content: Optional[str] = None, *, coalesce: bool = True, **kwargs
+    ) -> discord.Message:
+        """channel.send(content, **kwargs) in the background lane, resolves to the message that carried content
+
+        With coalesce, plain text may be sent together with other pending messages of the channel, joined by newlines.
+        """
+        if not self._tasks:
+            return await channel.send(content, **kwargs)
+        if self._closing:
+            raise RuntimeError("Outbound dispatcher is closing")
+        if self._pending_messages >= self.max_pending:
+            raise OutboundQueueFull(f"{self._pending_messages} messages already waiting")
+        channel_id = getattr(channel, "id", id(channel))
+        future = asyncio.get_running_loop().create_future()
+        queue = self._channels.get(channel_id)
+        if queue is None:
+            queue = self._channels[channel_id] = deque()
+        queue.append(_Message(channel, content, kwargs, coalesce, future))
+        self._pending_messages += 1
+        if channel_id not in self._busy and len(queue) == 1:
+            self._ready.append(channel_id)
+        self._wakeup.set()
+        return await future
+
+    # --- workers ---
+
+    def _next(self):
+        if not self._ready:
+            return None
+        channel_id = self._ready.popleft()
+        queue = self._channels[channel_id]
+        first = queue.popleft()
+        batch, content = [first], first.content
+        if first.mergeable:
+            while queue and queue[0].mergeable and len(content) + 1 + len(queue[0].content) <= MAX_CONTENT:
+                batch.append(queue.popleft())
+                content = f"{content}\n{batch[-1].content}"
+        self._pending_messages -= len(batch)
+        self._busy.add(channel_id)
+        return channel_id, batch, content
+
+    async def _run_batch(self, channel_id: int, batch: List[_Message], content: Optional[str]) -> None:
+        now = time.perf_counter()
+        for message in batch:
+            self.wait_time.observe(now - message.enqueued)
+        self.calls[BACKGROUND] += 1
+        self.merged += len(batch) - 1
+        futures = [message.future for message in batch]
+        try:
+            result = await batch[0].channel.send(content, **batch[0].kwargs)
+        except asyncio.CancelledError:
+            for future in futures:
+                future.cancel()
+            raise
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for future in futures:
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._busy.discard(channel_id)
+            if self._channels.get(channel_id):
+                self._ready.append(channel_id)
+                self._wakeup.set()
+            else:
+                self._channels.pop(channel_id, None)
+
+    async def _worker(self) -> None:
+        while True:
+            if self._responding and self._sending >= self.background_while_responding and self._ready:
+                # interaction calls first, this send waits until they are done
+                self.yielded += 1
+                await self._no_responses.wait()
+                continue
+            job = self._next()
+            if job is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            self._sending += 1
+            try:
+                await self._run_batch(*job)
+            finally:
+                self._sending -= 1
+
+    # --- lifecycle ---
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._closing = False
+        self._tasks = [asyncio.create_task(self._worker(), name=f"outbound-{index}") for index in range(self.workers)]
+
+    @property
+    def depth(self) -> Dict[str, int]:
+        """interaction calls in flight and background messages waiting"""
+        return {INTERACTION: self._responding, BACKGROUND: self._pending_messages}
+
+    async def close(self, timeout: float = 5.0) -> None:
+        """stop accepting background sends, let queued ones go for up to timeout seconds, then cancel the rest"""
+        if not self._tasks:
+            return
+        self._closing = True
+        deadline = time.monotonic() + timeout
+        while (self._pending_messages or self._busy) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        dropped = 0
+        for queue in self._channels.values():
+            for message in queue:
+                if not message.future.done():
+                    message.future.cancel()
+                    dropped += 1
+        self._channels.clear()
+        self._ready.clear()
+        self._pending_messages = 0
+        if dropped:
+            log.warning("Outbound dispatcher closed with %d unsent messages", dropped)
+
+    def register_metrics(self, registry: MetricsRegistry) -> None:
+        registry.add_gauge(
+            "pybot_outbound_queue_depth",
+            "Interaction calls in flight and background messages waiting.",
+            lambda: {(("lane", lane),): depth for lane, depth in self.depth.items()},
+        )
+        registry.add_gauge(
+            "pybot_outbound_calls_total",
+            "Outbound REST calls made, per lane.",
+            lambda: {(("lane", lane),): count for lane, count in self.calls.items()},
+            kind="counter",
+        )
+        registry.add_gauge(
+            "pybot_outbound_merged_total",
+            "Background messages sent merged into a previous one.",
+            lambda: {(): self.merged},
+            kind="counter",
+        )
+        registry.add_gauge(
+            "pybot_outbound_yielded_total",
+            "Background sends held back while interaction calls were in flight.",
+            lambda: {(): self.yielded},
+            kind="counter",
+        )
+        registry.add_histogram(
+            "pybot_outbound_wait_seconds",
+            "Time background messages spent queued before their send started.",
+            lambda: {(("lane", BACKGROUND),): self.wait_time},
+        )
+
+
+def dispatcher_from_config(outbound_config: Dict) -> OutboundDispatcher:
+    """build the OutboundDispatcher described by the [outbound] config table"""
+    return OutboundDispatcher(
+        workers=outbound_config.get("workers", 4),
+        max_pending=outbound_config.get("max_pending", 10_000),
+        background_while_responding=outbound_config.get("background_while_responding", 1),
+    )
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import discord
+from discord import app_commands
+
+from ..core.checks import is_staff
+from ..core.config import _project_root, load_config
+from ..core.intents import missing_intents
+from ..core.loader import FeatureReport, load_features
+
+log = logging.getLogger(__name__)
+
+
+def _section(config: Dict, slug: str) -> tuple:
+    """config of a feature including its per-guild overlays, for change detection"""
+    overlays = {guild_id: guild.get("features", {}).get(slug) for guild_id, guild in config.get("guilds", {}).items()}
+    return config["features"].get(slug), overlays
+
+
+class FeatureReloader:
+    """Reload features in place, without restarting the bot
+
+    A reload removes the feature's commands from every scope of the tree, drops its modules from sys.modules,
+    registers it again through load_features with its current config section, then lets the sync planner decide
+    whether Discord needs to be told (only when the command payload changed).
+
+    Parameters:
+        bot: the running BotApp
+        config_path: config file re-read on each reload
+        interval: polling period of the file watcher in seconds
+    """
+
+    def __init__(self, bot, config_path: Path, *, interval: float = 2.0) -> None:
+        self.bot = bot
+        self.config_path = config_path
+        self.interval = interval
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._mtimes: Dict[Path, float] = {}
+
+    # --- reload ---
+
+    def _drop_modules(self, slug: str) -> None:
+        prefix = f"features.{slug}"
+        for name in [name for name in sys.modules if name == prefix or name.startswith(prefix + ".")]:
+            del sys.modules[name]
+
+    def _remove_commands(self, slug: str) -> Dict[Optional[int], List[app_commands.Command]]:
+        """remove the commands of a feature from every scope, return them by guild id to allow a rollback"""
+        tree = self.bot.tree
+        report: Optional[FeatureReport] = self.bot.feature_reports.get(slug)
+        removed: Dict[Optional[int], List[app_commands.Command]] = {}
+        if report is None:
+            return removed
+        for scope in self.bot.sync_scopes:
+            for name in report.commands:
+                cmd = tree.remove_command(name, guild=scope)
+                if cmd is not None:
+                    removed.setdefault(scope.id if scope else None, []).append(cmd)
+        return removed
+
+    def _restore_commands(self, removed: Dict[Optional[int], List[app_commands.Command]]) -> None:
+        for guild_id, cmds in removed.items():
+            guild = discord.Object(id=guild_id) if guild_id is not None else None
+            for cmd in cmds:
+                self.bot.tree.add_command(cmd, guild=guild, override=True)
+
+    def _published_names(self) -> set[str]:
+        return {cmd.name for scope in self.bot.sync_scopes for cmd in self.bot.tree.get_commands(guild=scope)}
+
+    async def reload(self, slug: str) -> str:
+        """reload one feature, return a human readable status"""
+        async with self._lock:
+            try:
+                config = load_config(self.config_path)
+            except Exception as e:
+                log.error("Reload of %s aborted, invalid configuration: %s", slug, e)
+                return f"Configuration invalide : {e}"
+            if slug not in config["enabled_features"] and slug not in self.bot.features:
+                return f"Feature {slug} inconnue ou désactivée."
+
+            removed = self._remove_commands(slug)
+            self._drop_modules(slug)
+
+            if slug not in config["enabled_features"]:
+                self.bot.config = config
+                self.bot.features.pop(slug, None)
+                self.bot.feature_reports.pop(slug, None)
+                await self._sync()
+                log.info("Feature %s unloaded", slug)
+                return f"Feature {slug} déchargée."
+
+            taken = self._published_names()
+            loaded, failed, reports = load_features(
+                self.bot.tree,
+                {**config, "enabled_features": [slug], "loader": {"parallel": False}},
+                wrappers=self.bot.command_wrappers,
+                store=self.bot.store,
+                available=[name for name in self.bot.features if name != slug],
+            )
+            conflicts = taken.intersection(reports[slug].commands)
+            if conflicts:
+                for name in reports[slug].commands:
+                    self.bot.tree.remove_command(name)
+                failed[slug] = "Command name conflict: " + ", ".join(sorted(conflicts))
+
+            if slug in failed:
+                self.bot.tree.clear_commands(guild=None)
+                self._restore_commands(removed)
+                log.error("Reload of %s failed, previous version kept: %s", slug, failed[slug])
+                return f"Échec du rechargement de {slug} : {failed[slug]}"
+
+            # only now: a failed reload keeps the running config, so the watcher still sees the change
+            self.bot.config = config
+            self.bot.features[slug] = loaded[slug]
+            self.bot.feature_reports[slug] = reports[slug]
+            self.bot.publish_commands()
+            synced = await self._sync()
+            log.info("Feature %s reloaded (synced: %s)", slug, synced or "nothing")
+            status = f"Feature {slug} rechargée" + (" et synchronisée." if synced else ", commandes inchangées.")
+            missing = missing_intents(slug, self.bot.intents)
+            if missing:
+                log.warning("Feature %s needs intents the bot was not started with: %s", slug, ", ".join(missing))
+                status += f"\n⚠️ Intents manquants (redémarrage nécessaire) : {', '.join(missing)}"
+            return status
+
+    async def _sync(self) -> Dict[str, int]:
+        synced = await self.bot.sync_planner.sync(self.bot.tree, self.bot.sync_scopes) if self.bot.syncs_commands else {}
+        self.bot.command_revision += 1
+        return synced
+
+    # --- file watcher ---
+
+    def _scan(self) -> Dict[Path, float]:
+        features_dir = _project_root() / "features"
+        paths = [self.config_path]
+        for slug in self.bot.config["enabled_features"]:
+            paths.extend((features_dir / slug).rglob("*.py"))
+        mtimes: Dict[Path, float] = {}
+        for path in paths:
+            try:
+                mtimes[path] = path.stat().st_mtime
+            except OSError:
+                continue
+        return mtimes
+
+    def _changed_slugs(self, before: Dict[Path, float], after: Dict[Path, float]) -> List[str]:
+        features_dir = _project_root() / "features"
+        changed = {path for path in before.keys() | after.keys() if before.get(path) != after.get(path)}
+        slugs: set[str] = set()
+        for path in changed:
+            if path == self.config_path:
+                slugs.update(self._config_changes())
+            elif path.is_relative_to(features_dir):
+                slugs.add(path.relative_to(features_dir).parts[0])
+        return sorted(slugs)
+
+    def _config_changes(self) -> set[str]:
+        """slugs whose section or enabled state differs between the running and the on-disk config"""
+        try:
+            new = load_config(self.config_path)
+        except Exception as e:
+            log.error("Ignoring config change, invalid configuration: %s", e)
+            return set()
+        old = self.bot.config
+        toggled = set(old["enabled_features"]).symmetric_difference(new["enabled_features"])
+        edited = {slug for slug in new["enabled_features"] if _section(old, slug) != _section(new, slug)}
+        return toggled | edited
+
+    async def _watch(self) -> None:
+        self._mtimes = await asyncio.to_thread(self._scan)
+        while True:
+            await asyncio.sleep(self.interval)
+            mtimes = await asyncio.to_thread(self._scan)
+            slugs = self._changed_slugs(self._mtimes, mtimes)
+            self._mtimes = mtimes
+            for slug in slugs:
+                log.info("Change detected for feature %s, reloading", slug)
+                await self.reload(slug)
+            if slugs:
+                self._mtimes = await asyncio.to_thread(self._scan)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._watch(), name="feature-reload-watcher")
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+def register_reload_command(tree: app_commands.CommandTree, reloader: FeatureReloader) -> None:
+    """add the staff-only /reload command to the tree"""
+
+    @tree.command(name="reload", description="Recharge une feature sans redémarrer le bot")
+    @is_staff()
+    @app_commands.describe(feature="Slug de la feature à recharger")
+    async def reload_command(interaction: discord.Interaction, feature: str):
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        status = await reloader.reload(feature)
+        await interaction.followup.send(status, ephemeral=True)
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+# features declare their settings next to FEATURE:
+#   SETTINGS = {
+#       "ephemeral_default": Setting(bool, default=True),
+#       "channel_id": Setting(int),                            -> required
+#       "mode": Setting(str, default="a", choices=("a", "b")),
+#   }
+# the loader validates [features.<slug>] and every [guilds.<id>.features.<slug>] overlay against it once, and
+# handlers read config.settings_for(guild_id).ephemeral_default, a plain attribute of a frozen slotted object.
+
+REQUIRED = object()
+
+
+class SettingsError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Setting:
+    type: type
+    default: Any = REQUIRED
+    choices: Optional[Tuple] = None
+
+    def check(self, section: str, name: str, value: Any) -> Any:
+        """return the value converted to the setting type or raise SettingsError
+
+        section is the dotted path of the config table the value comes from, for the error message.
+        """
+        expected = self.type
+        # bool is an int for isinstance, but "true" in an integer field is a typo, not a value
+        if isinstance(value, bool) and expected is not bool:
+            valid = False
+        elif expected is float and isinstance(value, int):
+            value, valid = float(value), True
+        elif expected is tuple and isinstance(value, list):
+            value, valid = tuple(value), True
+        else:
+            valid = isinstance(value, expected)
+        if not valid:
+            raise SettingsError(
+                f"{section}.{name} must be {expected.__name__}, got {type(value).__name__} ({value!r})"
+            )
+        if self.choices is not None and value not in self.choices:
+            raise SettingsError(f"{section}.{name} must be one of {', '.join(map(repr, self.choices))}, got {value!r}")
+        return value
+
+
+class Settings:
+    """base of the generated settings classes, instances are read-only"""
+
+    __slots__ = ()
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({values})"
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class SettingsSchema:
+    """a feature's SETTINGS compiled once into a slotted class"""
+
+    def __init__(self, slug: str, fields: Mapping[str, Setting]) -> None:
+        for name, setting in fields.items():
+            if not name.isidentifier() or name.startswith("_"):
+                raise SettingsError(f"Invalid setting name {name!r} in {slug} SETTINGS")
+            if not isinstance(setting, Setting):
+                raise SettingsError(f"SETTINGS[{name!r}] of {slug} must be a Setting, got {type(setting).__name__}")
+            if setting.default is not REQUIRED:
+                try:
+                    setting.check(f"features.{slug}", name, setting.default)
+                except SettingsError as e:
+                    raise SettingsError(f"Invalid default of SETTINGS[{name!r}] in {slug}: {e}") from None
+        self.slug = slug
+        self.fields = dict(fields)
+        class_name = "".join(part.capitalize() for part in slug.split("_")) + "Settings"
+        self.cls = type(class_name, (Settings,), {"__slots__": tuple(self.fields)})
+
+    def build(self, section: Mapping[str, Any], path: Optional[str] = None) -> Settings:
+        """validate a config section and freeze it, unknown and missing keys are errors
+
+        path is where the section comes from in the config, features.<slug> by default.
+        """
+        path = path or f"features.{self.slug}"
+        unknown = sorted(set(section) - set(self.fields))
+        if unknown:
+            raise SettingsError(f"Unknown setting(s) in {path}: {', '.join(unknown)}")
+        instance = object.__new__(self.cls)
+        for name, setting in self.fields.items():
+            if name in section:
+                value = setting.check(path, name, section[name])
+            elif setting.default is not REQUIRED:
+                value = setting.default
+            else:
+                raise SettingsError(f"Missing required setting {path}.{name}")
+            object.__setattr__(instance, name, value)
+        return instance
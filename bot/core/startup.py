@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import time
+from typing import List, Tuple
+
+
+class StartupProfile:
+    """wall-clock durations of the startup phases, from the start of main to the first on_ready
+
+    Each mark closes the phase opened by the previous one, so the phases add up to the total.
+    """
+
+    def __init__(self) -> None:
+        self.origin = time.perf_counter()
+        self._last = self.origin
+        self.phases: List[Tuple[str, float]] = []
+
+    def mark(self, name: str, **parts: float) -> None:
+        """close the current phase as name, parts (name=seconds) are reported apart and deducted from it"""
+        now = time.perf_counter()
+        elapsed = now - self._last
+        self._last = now
+        self.phases.append((name, max(elapsed - sum(parts.values()), 0.0)))
+        self.phases.extend((part, seconds) for part, seconds in parts.items())
+
+    @property
+    def total(self) -> float:
+        return self._last - self.origin
+
+    def report(self) -> str:
+        total = self.total or 1e-9
+        lines = [f"{'phase':<16}{'ms':>10}{'%':>7}"]
+        for name, seconds in self.phases:
+            lines.append(f"{name:<16}{seconds * 1000:>10.1f}{seconds / total * 100:>6.1f}%")
+        lines.append(f"{'total':<16}{self.total * 1000:>10.1f}")
+        return "\n".join(lines)
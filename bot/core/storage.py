@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import queue
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..core.config import _project_root
+
+log = logging.getLogger(__name__)
+
+# features that want persistence take a third parameter, register(tree, config, store), and get a FeatureStore
+# namespaced to their slug:
+#   await store.set("counter", 3)
+#   value = await store.get("counter", 0)
+# values are JSON documents (dict, list, str, int, float, bool, None)
+
+_DELETED = object()  # deleted (pending writes) or absent (cache) key
+_MISSING = object()  # not in the pending writes or the cache
+
+
+class Store:
+    """async key-value store over one SQLite file (WAL mode), shared by all features
+
+    Queries run on a small thread pool, each worker borrowing one of `pool_size` connections. Writes land in a
+    write-behind buffer (latest value per key) flushed in one transaction every `flush_interval` seconds or as soon
+    as `batch_size` keys are pending. Reads see pending writes first, the batch being flushed included, then an LRU
+    cache of `cache_size` encoded values (absent keys included), then the database. close() flushes everything left.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        pool_size: int = 2,
+        flush_interval: float = 1.0,
+        batch_size: int = 500,
+        cache_size: int = 4096,
+    ) -> None:
+        self.path = path
+        self.pool_size = max(pool_size, 1)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._connections: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._all_connections: List = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Dict[Tuple[str, str], Any] = {}
+        self._flushing: Dict[Tuple[str, str], Any] = {}  # the batch being written, not committed yet
+        self._cache: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+        self._generation = 0  # bumped by every write
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+        self.stats = {"hits": 0, "misses": 0, "flushes": 0, "written": 0}
+
+    # --- connections ---
+
+    def _connect(self) -> None:
+        import sqlite3
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        for _ in range(self.pool_size):
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._all_connections.append(conn)
+            self._connections.put(conn)
+        self._all_connections[0].execute(
+            "CREATE TABLE IF NOT EXISTS kv (namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+            "updated REAL NOT NULL, PRIMARY KEY (namespace, key)) WITHOUT ROWID"
+        )
+
+    def _with_connection(self, fn: Callable, *args):
+        conn = self._connections.get()
+        try:
+            return fn(conn, *args)
+        finally:
+            self._connections.put(conn)
+
+    async def _run(self, fn: Callable, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._with_connection, fn, *args)
+
+    async def start(self) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="storage")
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._connect)
+        self._flusher = asyncio.create_task(self._flush_loop())
+        log.info("Storage opened at %s (%d connections)", self.path, self.pool_size)
+
+    async def close(self) -> None:
+        if self._executor is None:
+            return
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        try:
+            await self.flush()
+        finally:
+            for conn in self._all_connections:
+                conn.close()
+            self._all_connections.clear()
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            log.info("Storage closed (%s)", self.stats)
+
+    # --- cache ---
+
+    def _remember(self, item: Tuple[str, str], encoded: Any) -> None:
+        self._cache[item] = encoded
+        self._cache.move_to_end(item)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    # --- reads and writes ---
+
+    @staticmethod
+    def _select(conn, namespace: str, key: str) -> Optional[str]:
+        row = conn.execute("SELECT value FROM kv WHERE namespace = ? AND key = ?", (namespace, key)).fetchone()
+        return row[0] if row else None
+
+    def _unflushed(self, item: Tuple[str, str]) -> Any:
+        """the latest write of item the database may not have yet, _MISSING if there is none"""
+        encoded = self._pending.get(item, _MISSING)
+        return self._flushing.get(item, _MISSING) if encoded is _MISSING else encoded
+
+    async def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        item = (namespace, key)
+        encoded = self._unflushed(item)
+        if encoded is _MISSING:
+            encoded = self._cache.get(item, _MISSING)
+            if encoded is not _MISSING:
+                self.stats["hits"] += 1
+                self._cache.move_to_end(item)
+            else:
+                self.stats["misses"] += 1
+                generation = self._generation
+                fetched = await self._run(self._select, namespace, key)
+                # a write may have happened while the query ran, it wins
+                encoded = self._unflushed(item)
+                if encoded is _MISSING:
+                    encoded = self._cache.get(item, _MISSING)
+                if encoded is _MISSING:
+                    encoded = _DELETED if fetched is None else fetched
+                    # only cache what no write could have made stale (written, flushed and evicted meanwhile)
+                    if generation == self._generation:
+                        self._remember(item, encoded)
+        if encoded is _DELETED:
+            return default
+        return json.loads(encoded)
+
+    async def set(self, namespace: str, key: str, value: Any) -> None:
+        # encoded right away: a value that is not JSON fails here, not in the flush, and later mutations of the
+        # caller's object do not leak into the store
+        self._write((namespace, key), json.dumps(value, separators=(",", ":")))
+
+    async def delete(self, namespace: str, key: str) -> None:
+        self._write((namespace, key), _DELETED)
+
+    def _write(self, item: Tuple[str, str], encoded: Any) -> None:
+        self._generation += 1
+        self._pending[item] = encoded
+        self._remember(item, encoded)
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def keys(self, namespace: str, prefix: str = "") -> List[str]:
+        await self.flush()
+        rows = await self._run(
+            lambda conn: conn.execute(
+                "SELECT key FROM kv WHERE namespace = ? AND substr(key, 1, ?) = ? ORDER BY key",
+                (namespace, len(prefix), prefix),
+            ).fetchall()
+        )
+        return [row[0] for row in rows]
+
+    # --- write-behind ---
+
+    @staticmethod
+    def _write_batch(conn, batch: Dict[Tuple[str, str], Any]) -> None:
+        now = time.time()
+        upserts = [(ns, key, value, now) for (ns, key), value in batch.items() if value is not _DELETED]
+        deletes = [item for item, value in batch.items() if value is _DELETED]
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if upserts:
+                conn.executemany("INSERT OR REPLACE INTO kv (namespace, key, value, updated) VALUES (?, ?, ?, ?)", upserts)
+            if deletes:
+                conn.executemany("DELETE FROM kv WHERE namespace = ? AND key = ?", deletes)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    async def flush(self) -> int:
+        """write every pending key in one transaction, return how many were written"""
+        async with self._flush_lock:
+            if not self._pending or self._executor is None:
+                return 0
+            batch, self._pending = self._pending, {}
+            # readers missing the cache look here until the transaction committed, not at the database
+            self._flushing = batch
+            try:
+                await self._run(self._write_batch, batch)
+            except Exception:
+                # keep the batch for the next flush, unless a newer write replaced a key meanwhile
+                for item, encoded in batch.items():
+                    self._pending.setdefault(item, encoded)
+                raise
+            finally:
+                self._flushing = {}
+            self.stats["flushes"] += 1
+            self.stats["written"] += len(batch)
+            return len(batch)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                log.error("Storage flush failed, retrying later: %s", e)
+
+    def namespace(self, namespace: str) -> "FeatureStore":
+        return FeatureStore(self, namespace)
+
+
+class FeatureStore:
+    """the view of the Store given to a feature, every key lives in the feature's namespace (its slug)"""
+
+    __slots__ = ("_store", "namespace")
+
+    def __init__(self, store: Store, namespace: str) -> None:
+        self._store = store
+        self.namespace = namespace
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        return await self._store.get(self.namespace, key, default)
+
+    async def set(self, key: str, value: Any) -> None:
+        await self._store.set(self.namespace, key, value)
+
+    async def delete(self, key: str) -> None:
+        await self._store.delete(self.namespace, key)
+
+    async def keys(self, prefix: str = "") -> List[str]:
+        return await self._store.keys(self.namespace, prefix)
+
+    async def flush(self) -> int:
+        return await self._store.flush()
+
+
+def store_from_config(storage_config: Dict) -> Store:
+    """build the Store described by the [storage] config table"""
+    path = Path(storage_config.get("path", "data/storage.db"))
+    if not path.is_absolute():
+        path = _project_root() / path
+    return Store(
+        path,
+        pool_size=storage_config.get("pool_size", 2),
+        flush_interval=storage_config.get("flush_interval", 1.0),
+        batch_size=storage_config.get("batch_size", 500),
+        cache_size=storage_config.get("cache_size", 4096),
+    )
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from discord import app_commands
+from discord.abc import Snowflake
+
+from ..core.config import _project_root
+
+log = logging.getLogger(__name__)
+
+SNAPSHOT_FILENAME = ".command_sync.json"
+
+
+@dataclass(frozen=True)
+class SyncTarget:
+    key: str
+    guild: Optional[Snowflake]
+    payload_hash: str
+    count: int
+
+
+def command_payload(tree: app_commands.CommandTree, guild: Optional[Snowflake] = None) -> List[Dict]:
+    """serialize the commands of a scope exactly like tree.sync would send them"""
+    payload = [cmd.to_dict(tree) for cmd in tree.get_commands(guild=guild)]
+    payload.sort(key=lambda data: (data.get("type", 1), data["name"]))
+    return payload
+
+
+def payload_hash(payload: List[Dict]) -> str:
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SyncPlanner:
+    """Decide which command scopes actually need a tree.sync call
+
+    The hash of the last payload synced for each scope (global or guild) is persisted in a snapshot file
+    at the project root, so a restart with unchanged features costs zero REST calls.
+
+    Parameters:
+        path: snapshot file location, defaults to <project root>/.command_sync.json
+        force: sync every scope regardless of the snapshot (--force-sync)
+    """
+
+    def __init__(self, path: Optional[Path] = None, *, force: bool = False) -> None:
+        self.path = path or _project_root() / SNAPSHOT_FILENAME
+        self.force = force
+        self._snapshot: Optional[Dict[str, str]] = None
+
+    @property
+    def snapshot(self) -> Dict[str, str]:
+        if self._snapshot is None:
+            self._snapshot = self._read()
+        return self._snapshot
+
+    def _read(self) -> Dict[str, str]:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            log.warning("Ignoring unreadable command sync snapshot %s: %s", self.path, e)
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _write(self) -> None:
+        try:
+            self.path.write_text(json.dumps(self.snapshot, indent=2, sort_keys=True), encoding="utf-8")
+        except OSError as e:
+            log.warning("Failed to write command sync snapshot %s: %s", self.path, e)
+
+    @staticmethod
+    def scope_key(application_id: Optional[int], guild: Optional[Snowflake]) -> str:
+        scope = "global" if guild is None else f"guild:{guild.id}"
+        return f"{application_id}:{scope}"
+
+    def plan(
+        self, tree: app_commands.CommandTree, guilds: Iterable[Optional[Snowflake]]
+    ) -> List[SyncTarget]:
+        """return the scopes whose current payload differs from the snapshot (all of them when forced)"""
+        application_id = tree.client.application_id
+        targets: List[SyncTarget] = []
+        for guild in guilds:
+            payload = command_payload(tree, guild)
+            key = self.scope_key(application_id, guild)
+            digest = payload_hash(payload)
+            if self.force or self.snapshot.get(key) != digest:
+                targets.append(SyncTarget(key=key, guild=guild, payload_hash=digest, count=len(payload)))
+            else:
+                log.debug("Commands unchanged for %s, skipping sync", key)
+        return targets
+
+    async def execute(self, tree: app_commands.CommandTree, targets: List[SyncTarget]) -> Dict[str, int]:
+        """sync each planned target and record it in the snapshot once Discord accepted it"""
+        synced: Dict[str, int] = {}
+        for target in targets:
+            result = await tree.sync(guild=target.guild)
+            self.snapshot[target.key] = target.payload_hash
+            synced[target.key] = len(result)
+        if synced:
+            self._write()
+        return synced
+
+    async def sync(self, tree: app_commands.CommandTree, guilds: Iterable[Optional[Snowflake]]) -> Dict[str, int]:
+        return await self.execute(tree, self.plan(tree, guilds))
@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import discord
+from discord import app_commands
+
+from ..core.checks import is_staff
+from ..core.config import _project_root
+
+log = logging.getLogger(__name__)
+
+OK = "ok"
+ERROR = "error"
+REFUSED = "refused"
+
+# period -> bucket size in seconds, UTC
+PERIODS: Dict[str, int] = {"minute": 60, "hour": 3600, "day": 86400}
+
+# /usage windows -> (seconds, finest period whose retention covers it)
+WINDOWS: Dict[str, Tuple[int, str]] = {
+    "1h": (3600, "minute"),
+    "24h": (86400, "hour"),
+    "7d": (7 * 86400, "hour"),
+    "30d": (30 * 86400, "day"),
+}
+DIMENSIONS = ("command", "feature", "user")
+
+# (time, guild id, feature, command, user id, outcome)
+Event = Tuple[float, int, str, str, int, str]
+
+
+class UsageRecorder:
+    """command usage analytics: events in memory, per minute / hour / day counts on disk
+
+    Recording appends a tuple to a ring buffer of `buffer_size` events (the oldest are dropped if the flush falls
+    behind) and never touches the disk. Every `flush_interval` seconds a background task aggregates the buffer and
+    adds the counts to the rollup rows of a SQLite file, in one transaction run off the event loop. Raw events are
+    never stored; rows older than the retention of their period are pruned after the flushes. Queries use a second
+    connection, WAL lets them read while a flush writes; each connection is used by one thread at a time.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        buffer_size: int = 10_000,
+        flush_interval: float = 5.0,
+        retention_days: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self.path = path
+        self.flush_interval = flush_interval
+        self.retention_days = {"minute": 1, "hour": 30, "day": 365, **(retention_days or {})}
+        self._buffer: Deque[Event] = deque(maxlen=buffer_size)
+        self._features: Dict[str, str] = {}  # command qualified name -> feature slug
+        self._conn = None
+        self._reader = None
+        self._lock = asyncio.Lock()  # flushes, on _conn
+        self._read_lock = asyncio.Lock()  # queries, on _reader
+        self._task: Optional[asyncio.Task] = None
+        self._last_prune = 0.0
+        self.dropped = 0
+        self.flushed = 0
+
+    # --- recording ---
+
+    def record(self, interaction: discord.Interaction, outcome: str) -> None:
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        command = interaction.command.qualified_name if interaction.command else "?"
+        feature = self._features.get(command, "core")
+        self._buffer.append((time.time(), interaction.guild_id or 0, feature, command, interaction.user.id, outcome))
+
+    def instrument(self, callback: Callable, command: app_commands.Command, feature_info: Dict) -> Callable:
+        """command wrapper for load_features: record every invocation with its outcome
+
+        Check failures are recorded by BotApp.on_tree_error, which also sees the checks that run before the callback.
+        """
+        self._features[command.qualified_name] = feature_info.get("slug", "?")
+
+        @functools.wraps(callback)
+        async def wrapper(*args, **kwargs):
+            interaction: discord.Interaction = args[-1]
+            try:
+                result = await callback(*args, **kwargs)
+            except app_commands.CheckFailure:
+                raise
+            except Exception:
+                self.record(interaction, ERROR)
+                raise
+            self.record(interaction, OK)
+            return result
+
+        return wrapper
+
+    # --- storage ---
+
+    def _connect(self) -> None:
+        import sqlite3
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS usage (period TEXT NOT NULL, bucket INTEGER NOT NULL, "
+            "guild_id INTEGER NOT NULL, command TEXT NOT NULL, user_id INTEGER NOT NULL, feature TEXT NOT NULL, "
+            "calls INTEGER NOT NULL, errors INTEGER NOT NULL, refused INTEGER NOT NULL, "
+            "PRIMARY KEY (period, bucket, guild_id, command, user_id)) WITHOUT ROWID"
+        )
+        self._reader = sqlite3.connect(self.path, timeout=10.0, isolation_level=None, check_same_thread=False)
+
+    @staticmethod
+    def _rollup(events: List[Event]) -> Dict[Tuple, List[int]]:
+        """(period, bucket, guild, command, user, feature) -> [calls, errors, refused]"""
+        rows: Dict[Tuple, List[int]] = {}
+        for at, guild_id, feature, command, user_id, outcome in events:
+            for period, size in PERIODS.items():
+                key = (period, int(at) - int(at) % size, guild_id, command, user_id, feature)
+                counts = rows.get(key)
+                if counts is None:
+                    counts = rows[key] = [0, 0, 0]
+                counts[0] += 1
+                counts[1] += outcome == ERROR
+                counts[2] += outcome == REFUSED
+        return rows
+
+    def _write(self, events: List[Event], prune_before: Optional[Dict[str, int]]) -> None:
+        rows = self._rollup(events)
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO usage (period, bucket, guild_id, command, user_id, feature, calls, errors, refused) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (period, bucket, guild_id, command, user_id) DO UPDATE "
+                "SET calls = calls + excluded.calls, errors = errors + excluded.errors, "
+                "refused = refused + excluded.refused, feature = excluded.feature",
+                [(*key, *counts) for key, counts in rows.items()],
+            )
+            if prune_before:
+                conn.executemany("DELETE FROM usage WHERE period = ? AND bucket < ?", list(prune_before.items()))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    async def flush(self) -> int:
+        """add the buffered events to the rollups, return how many were written"""
+        async with self._lock:
+            if self._conn is None:
+                return 0
+            events = list(self._buffer)
+            self._buffer.clear()
+            prune_before = None
+            now = time.time()
+            if now - self._last_prune >= 3600:
+                prune_before = {period: int(now - days * 86400) for period, days in self.retention_days.items()}
+            if not events and prune_before is None:
+                return 0
+            try:
+                await asyncio.to_thread(self._write, events, prune_before)
+            except Exception:
+                # put them back in front of the newer ones, the oldest are dropped if that overflows the ring buffer
+                self._buffer = deque([*events, *self._buffer], maxlen=self._buffer.maxlen)
+                raise
+            if prune_before is not None:
+                self._last_prune = now
+            self.flushed += len(events)
+            return len(events)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                log.error("Usage flush failed, retrying later: %s", e)
+
+    async def start(self) -> None:
+        await asyncio.to_thread(self._connect)
+        self._task = asyncio.create_task(self._flush_loop(), name="usage-flush")
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._conn is not None:
+            try:
+                await self.flush()
+            except Exception as e:
+                log.error("Final usage flush failed, %d events lost: %s", len(self._buffer), e)
+            self._conn.close()
+            self._conn = None
+        if self._reader is not None:
+            async with self._read_lock:
+                self._reader.close()
+                self._reader = None
+
+    # --- queries ---
+
+    def _top(self, dimension: str, period: str, since: int, guild_id: int, limit: int) -> List[Tuple]:
+        column = {"command": "command, feature", "feature": "feature", "user": "user_id"}[dimension]
+        return self._reader.execute(
+            f"SELECT {column}, SUM(calls) AS total, SUM(errors), SUM(refused) FROM usage "
+            f"WHERE period = ? AND bucket >= ? AND guild_id = ? GROUP BY {column} ORDER BY total DESC LIMIT ?",
+            (period, since, guild_id, limit),
+        ).fetchall()
+
+    async def top(self, dimension: str, window: str, guild_id: int, limit: int = 10) -> List[Tuple]:
+        """most used commands, features or users of a guild over a window of WINDOWS, from the rollups
+
+        Rows are (command, feature | feature | user id, calls, errors, refused), most calls first.
+        """
+        seconds, period = WINDOWS[window]
+        await self.flush()
+        size = PERIODS[period]
+        since = int(time.time() - seconds) // size * size
+        async with self._read_lock:
+            if self._reader is None:
+                return []
+            return await asyncio.to_thread(self._top, dimension, period, since, guild_id, limit)
+
+
+def recorder_from_config(usage_config: Dict) -> Optional[UsageRecorder]:
+    """build the UsageRecorder described by the [usage] config table, None if disabled"""
+    if not usage_config.get("enabled", True):
+        return None
+    path = Path(usage_config.get("path", "data/usage.db"))
+    if not path.is_absolute():
+        path = _project_root() / path
+    return UsageRecorder(
+        path,
+        buffer_size=usage_config.get("buffer_size", 10_000),
+        flush_interval=usage_config.get("flush_interval", 5.0),
+        retention_days=usage_config.get("retention_days"),
+    )
+
+
+def register_usage_command(tree: app_commands.CommandTree, recorder: UsageRecorder) -> None:
+    """add the staff-only /usage command to the tree"""
+
+    @tree.command(name="usage", description="Commandes, features ou membres les plus actifs")
+    @is_staff()
+    @app_commands.describe(by="Ce qui est classé", window="Période", limit="Nombre de lignes")
+    @app_commands.choices(
+        by=[app_commands.Choice(name=name, value=name) for name in DIMENSIONS],
+        window=[app_commands.Choice(name=name, value=name) for name in WINDOWS],
+    )
+    async def usage_command(
+        interaction: discord.Interaction,
+        by: str = "command",
+        window: str = "24h",
+        limit: app_commands.Range[int, 1, 25] = 10,
+    ):
+        rows = await recorder.top(by, window, interaction.guild_id or 0, limit)
+        embed = discord.Embed(title=f"Top {by} ({window})", color=discord.Color.blurple())
+        lines = []
+        for rank, row in enumerate(rows, start=1):
+            *label, calls, errors, refused = row
+            if by == "command":
+                name = f"/{label[0]} ({label[1]})"
+            elif by == "user":
+                name = f"<@{label[0]}>"
+            else:
+                name = label[0]
+            lines.append(f"{rank}. {name} : {calls} appels, {errors} erreurs, {refused} refus")
+        embed.description = "\n".join(lines) or "Aucune utilisation enregistrée sur cette période."
+        await interaction.response.send_message(embed=embed, ephemeral=True)
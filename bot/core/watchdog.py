@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from dataclasses import dataclass
+from pathlib import Path
+from types import FrameType
+from typing import Deque, Dict, Optional, Tuple
+
+from ..core.config import _project_root
+from ..core.metrics import Histogram, MetricsRegistry
+
+log = logging.getLogger(__name__)
+
+# seconds
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+STACK_LIMIT = 12  # innermost frames kept in a sample
+CORE = "core"  # stalls that no feature frame is part of
+
+
+@dataclass
+class StallSample:
+    """what the event loop thread was running while it was blocked"""
+
+    feature: str
+    blocked: float  # seconds, the loop lag once it ran again
+    stack: str
+    at: float  # time.time()
+
+
+class LoopWatchdog:
+    """measures the event loop lag and finds out who blocks it
+
+    A heartbeat task sleeps `interval` seconds at a time: how late it wakes up is the loop lag. A monitor thread
+    watches the heartbeat, and when it is more than `threshold` seconds late, the loop thread is busy running
+    something that does not yield: its current stack is sampled and attributed to the feature whose code is in it
+    (innermost first), "core" otherwise. The stall is logged with the stack once the loop runs again.
+
+    With slow_callbacks, asyncio debug mode is turned on so that asyncio itself logs every callback running longer
+    than the threshold ("Executing <Task ...> took 0.2 seconds"); those are counted as well. Debug mode slows the
+    whole loop down, it is meant for investigations.
+    """
+
+    def __init__(
+        self, *, interval: float = 0.5, threshold: float = 0.1, slow_callbacks: bool = False, samples: int = 20
+    ) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.slow_callbacks = slow_callbacks
+        self.lag = Histogram(LAG_BUCKETS)
+        self.max_lag = 0.0
+        self.stalls: Counter = Counter()  # feature -> stalls
+        self.slow_callback_count = 0
+        self.samples: Deque[StallSample] = deque(maxlen=samples)
+        self._features_dir = _project_root() / "features"
+        self._beat = time.monotonic()
+        self._pending: Optional[Tuple[str, str]] = None  # (feature, stack) sampled during the current stall
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._asyncio_filter: Optional[logging.Filter] = None
+
+    # --- event loop side ---
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat(), name="loop-watchdog")
+        self._thread = threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        if self.slow_callbacks:
+            loop.slow_callback_duration = self.threshold
+            loop.set_debug(True)
+            self._asyncio_filter = _SlowCallbackCounter(self)
+            logging.getLogger("asyncio").addFilter(self._asyncio_filter)
+        log.info("Loop watchdog started (interval %.2f s, threshold %.0f ms)", self.interval, self.threshold * 1000)
+
+    async def _heartbeat(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._beat = now
+            lag = max(now - expected, 0.0)
+            self.lag.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if lag > self.threshold:
+                self._report(lag)
+
+    def _report(self, lag: float) -> None:
+        pending, self._pending = self._pending, None
+        if pending is None:
+            # shorter than a monitor tick, or the whole process was paused: nothing to attribute
+            log.warning("Event loop lagged %.0f ms", lag * 1000)
+            return
+        feature, stack = pending
+        self.stalls[feature] += 1
+        self.samples.append(StallSample(feature, lag, stack, time.time()))
+        log.warning("Event loop blocked for %.0f ms by %s:\n%s", lag * 1000, feature, stack)
+
+    async def close(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        if self._asyncio_filter is not None:
+            logging.getLogger("asyncio").removeFilter(self._asyncio_filter)
+            self._asyncio_filter = None
+
+    # --- monitor thread ---
+
+    def _monitor(self) -> None:
+        sampled_beat = None
+        while not self._stop.wait(max(self.threshold / 2, 0.01)):
+            beat = self._beat
+            if beat == sampled_beat or time.monotonic() - beat - self.interval <= self.threshold:
+                continue
+            # one sample per stall, taken while the loop thread is still stuck in it
+            sampled_beat = beat
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is not None:
+                self._pending = (self._attribute(frame), "".join(traceback.format_stack(frame, limit=STACK_LIMIT)))
+            del frame
+
+    def _attribute(self, frame: Optional[FrameType]) -> str:
+        """slug of the innermost feature frame of the stack"""
+        while frame is not None:
+            path = Path(frame.f_code.co_filename)
+            if self._features_dir in path.parents:
+                return path.relative_to(self._features_dir).parts[0]
+            frame = frame.f_back
+        return CORE
+
+    # --- export ---
+
+    def register_metrics(self, registry: MetricsRegistry) -> None:
+        registry.add_histogram(
+            "pybot_loop_lag_seconds",
+            "How late the event loop ran the watchdog heartbeat.",
+            lambda: {(): self.lag},
+        )
+        registry.add_gauge(
+            "pybot_loop_stalls_total",
+            "Event loop stalls longer than the watchdog threshold, per feature found in the sampled stack.",
+            lambda: {(("feature", feature),): count for feature, count in self.stalls.items()},
+            kind="counter",
+        )
+        registry.add_gauge(
+            "pybot_loop_slow_callbacks_total",
+            "Callbacks reported slow by asyncio debug mode.",
+            lambda: {(): self.slow_callback_count},
+            kind="counter",
+        )
+        registry.add_stats_field(self._stats_field)
+
+    def _stats_field(self) -> Tuple[str, str]:
+        value = (
+            f"lag p50 {self.lag.quantile(0.5) * 1000:.1f} ms · p99 {self.lag.quantile(0.99) * 1000:.1f} ms · "
+            f"max {self.max_lag * 1000:.0f} ms"
+        )
+        if self.stalls:
+            blocked = ", ".join(f"{feature} ×{count}" for feature, count in self.stalls.most_common(5))
+            value += f"\nBlocages > {self.threshold * 1000:.0f} ms : {blocked}"
+        if self.slow_callbacks:
+            value += f"\nCallbacks lents : {self.slow_callback_count}"
+        return "Boucle d'événements", value
+
+
+class _SlowCallbackCounter(logging.Filter):
+    """counts asyncio's slow callback warnings, lets them through"""
+
+    def __init__(self, watchdog: LoopWatchdog) -> None:
+        super().__init__()
+        self.watchdog = watchdog
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.msg, str) and record.msg.startswith("Executing"):
+            self.watchdog.slow_callback_count += 1
+        return True
+
+
+def watchdog_from_config(watchdog_config: Dict) -> Optional[LoopWatchdog]:
+    """build the LoopWatchdog described by the [watchdog] config table, None if disabled"""
+    if not watchdog_config.get("enabled", True):
+        return None
+    return LoopWatchdog(
+        interval=watchdog_config.get("interval", 0.5),
+        threshold=watchdog_config.get("threshold", 0.1),
+        slow_callbacks=watchdog_config.get("slow_callbacks", False),
+    )
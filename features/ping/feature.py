@@ -8,7 +8,8 @@ FEATURE = {
     "version": "1.0.0", # The version of the feature
     "author": "Tryno", # The author of the feature
     "requires_config": False, # Whether the feature requires configuration
-    "permissions": ["send_messages", "embed_links"] # Required permissions
+    "permissions": ["send_messages", "embed_links"], # Required permissions
+    "provides": ["ping"], # Top-level commands registered
 }
 
 def register(tree, config): # Register the feature's commands with the bot's command tree
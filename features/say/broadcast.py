@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Sequence
+
+import discord
+
+MAX_CONTENT = 2000  # Discord message length limit
+WORKERS = 8  # channels sent to at the same time, the outbound dispatcher caps the actual REST calls
+PROGRESS_INTERVAL = 2.0  # seconds between two edits of the status message
+MAX_TARGETS = 500
+
+_ID = re.compile(r"\d{15,20}")
+
+Target = discord.abc.Messageable
+
+
+def chunk_text(text: str, limit: int = MAX_CONTENT) -> List[str]:
+    """split text in messages of at most limit characters, at a line break or a space when there is one"""
+    chunks = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit + 1)
+        if cut <= 0:
+            cut = text.rfind(" ", 0, limit + 1)
+        if cut <= 0:
+            chunks.append(text[:limit])
+            text = text[limit:]
+        else:
+            # the separator itself is dropped
+            chunks.append(text[:cut])
+            text = text[cut + 1 :]
+    if text:
+        chunks.append(text)
+    return chunks
+
+
+def _can_send(channel, member: discord.Member) -> bool:
+    permissions = channel.permissions_for(member)
+    if isinstance(channel, discord.Thread):
+        return permissions.send_messages_in_threads and not channel.archived
+    return permissions.send_messages
+
+
+def resolve_targets(
+    guild: discord.Guild,
+    *,
+    channel_ids: str = "",
+    category: Optional[discord.CategoryChannel] = None,
+    role: Optional[discord.Role] = None,
+) -> tuple[List[Target], List[str]]:
+    """the channels and threads designated by the options the bot can post in, and the ids it rejected
+
+    channel_ids: ids or mentions of text channels and threads, separated by spaces or commas
+    category: its text channels and their active threads
+    role: every text channel that role can see and write in
+    """
+    me = guild.me
+    targets: Dict[int, Target] = {}
+    rejected: List[str] = []
+
+    for raw_id in _ID.findall(channel_ids):
+        channel = guild.get_channel_or_thread(int(raw_id))
+        if isinstance(channel, (discord.TextChannel, discord.Thread)) and _can_send(channel, me):
+            targets[channel.id] = channel
+        else:
+            rejected.append(raw_id)
+
+    if category is not None:
+        for channel in category.text_channels:
+            if _can_send(channel, me):
+                targets[channel.id] = channel
+            for thread in channel.threads:
+                if _can_send(thread, me):
+                    targets[thread.id] = thread
+
+    if role is not None:
+        for channel in guild.text_channels:
+            permissions = channel.permissions_for(role)
+            if permissions.view_channel and permissions.send_messages and _can_send(channel, me):
+                targets[channel.id] = channel
+
+    return list(targets.values()), rejected
+
+
+@dataclass
+class BroadcastResult:
+    total: int
+    sent: List[Target] = field(default_factory=list)
+    failed: Dict[int, str] = field(default_factory=dict)  # channel id -> reason
+
+    @property
+    def done(self) -> int:
+        return len(self.sent) + len(self.failed)
+
+
+class Broadcast:
+    """posts the chunks of one text to many channels, WORKERS channels at a time
+
+    Every message goes through the background lane of the outbound dispatcher, which sends one message at a time
+    per channel (the rate limit bucket of a channel's message route) and spreads channels over its own workers.
+    Chunks of a channel are sent in order. A progress callback is called at most every PROGRESS_INTERVAL seconds.
+    """
+
+    def __init__(self, outbound, targets: Sequence[Target], text: str) -> None:
+        self.outbound = outbound
+        self.targets: Deque[Target] = deque(targets)
+        self.chunks = chunk_text(text)
+        self.result = BroadcastResult(len(targets))
+
+    async def _send_all(self, channel: Target) -> None:
+        try:
+            for chunk in self.chunks:
+                await self.outbound.send(channel, chunk, coalesce=False)
+        except discord.Forbidden:
+            self.result.failed[channel.id] = "accès refusé"
+        except discord.HTTPException as e:
+            self.result.failed[channel.id] = f"erreur HTTP {e.status}"
+        except Exception as e:  # queue full, dispatcher closing
+            self.result.failed[channel.id] = type(e).__name__
+        else:
+            self.result.sent.append(channel)
+
+    async def _worker(self) -> None:
+        while self.targets:
+            await self._send_all(self.targets.popleft())
+
+    async def run(self, progress=None) -> BroadcastResult:
+        workers = [asyncio.create_task(self._worker()) for _ in range(min(WORKERS, len(self.targets)))]
+        try:
+            if progress is None:
+                await asyncio.gather(*workers)
+                return self.result
+            last = time.monotonic()
+            pending = set(workers)
+            while pending:
+                _, pending = await asyncio.wait(pending, timeout=PROGRESS_INTERVAL)
+                if pending and time.monotonic() - last >= PROGRESS_INTERVAL:
+                    last = time.monotonic()
+                    await progress(self.result)
+            return self.result
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+
+def progress_text(result: BroadcastResult) -> str:
+    return f"📣 Diffusion en cours : {result.done}/{result.total} salons ({len(result.failed)} échecs)"
+
+
+def summary_text(result: BroadcastResult, rejected: Sequence[str], *, interrupted: bool = False) -> str:
+    if interrupted:
+        lines = [
+            f"⏹️ Diffusion interrompue (redémarrage du bot) : ✅ {len(result.sent)}/{result.total} salons, "
+            f"{result.total - result.done} non traités"
+        ]
+    else:
+        lines = [f"📣 Diffusion terminée : ✅ {len(result.sent)}/{result.total} salons"]
+    if result.failed:
+        failures = ", ".join(f"<#{channel_id}> ({reason})" for channel_id, reason in list(result.failed.items())[:10])
+        more = f" et {len(result.failed) - 10} autres" if len(result.failed) > 10 else ""
+        lines.append(f"❌ {len(result.failed)} échecs : {failures}{more}")
+    if rejected:
+        lines.append(f"⚠️ Ignorés (introuvables ou sans droit d'écriture) : {', '.join(rejected[:10])}")
+    return "\n".join(lines)
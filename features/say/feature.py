@@ -1,21 +1,49 @@
+import asyncio
+from typing import Optional
+
 import discord
 from discord import app_commands
 
+from bot.core.autocomplete import MAX_LENGTH, Suggester, channels
 from bot.core.checks import is_staff
+from bot.core.loader import lazy_import
+from bot.core.settings import Setting
+
+broadcast = lazy_import("features.say.broadcast")  # only /say broadcast needs it, loaded on its first use
 
 FEATURE = {
     "slug": "say",  # The unique identifier for the feature
     "name": "Say Feature",  # The display name of the feature
     "description": "A feature that allows the bot to say messages.",  # A brief description of the feature
-    "version": "1.0.0",  # The version of the feature
+    "version": "1.2.1",  # The version of the feature
     "author": "Tryno",  # The author of the feature
     "requires_config": True,  # Whether the feature requires configuration
     "permissions": ["send_messages", "embed_links"],  # Required permissions
+    "provides": ["say"],  # Top-level commands registered
+}
+
+SETTINGS = {  # The settings of [features.say], validated once when the feature is loaded
+    "ephemeral_default": Setting(bool, default=False),  # Whether the bot's answer is only visible to the caller
 }
 
 
 def register(tree: app_commands.CommandTree, config):  # Register the feature's commands with the bot's command tree
-    @tree.command(name=FEATURE["slug"], description=FEATURE["description"])  # Define a new command in the command tree
+    group = app_commands.Group(name=FEATURE["slug"], description=FEATURE["description"])  # /say here, /say broadcast
+    # Text and announcement channels of the guild, read from the cache at most every 10 s per guild
+    channel_suggester = Suggester(channels(discord.ChannelType.text, discord.ChannelType.news))
+
+    async def channels_autocomplete(interaction: discord.Interaction, current: str):
+        """Suggest a channel for the last ID being typed, the value keeps the IDs already typed before it"""
+        typed, _, last = current.rpartition(" ")
+        prefix = f"{typed} " if typed else ""
+        choices = await channel_suggester.complete(interaction, last)
+        return [
+            app_commands.Choice(name=choice.name, value=prefix + choice.value)
+            for choice in choices
+            if len(prefix) + len(choice.value) <= MAX_LENGTH
+        ]
+
+    @group.command(name="here", description="Make the bot say a message in this channel.")
     @is_staff()
     @app_commands.describe(message="The message for the bot to say.")  # Describe the command parameter
     async def say_command(
@@ -27,10 +55,71 @@ def register(tree: app_commands.CommandTree, config):  # Register the feature's
             interaction: The interaction object.
             message: The message to be sent by the bot.
         """
-        ephemeral_default = (
-            bool(config.get("ephemeral_default")) if isinstance(config, dict) else False
-        )  # Get ephemeral default from config
-        await interaction.response.send_message(
-            message, ephemeral=ephemeral_default
-        )  # Respond with the provided message
-        # Add any additional logic for your custom feature here
+        settings = config.settings_for(interaction.guild_id)  # This guild's validated settings
+        await interaction.client.outbound.respond(
+            interaction.response.send_message, message, ephemeral=settings.ephemeral_default
+        )  # Respond with the provided message, through the interaction lane of the outbound dispatcher
+
+    @group.command(name="broadcast", description="Post a message to many channels at once.")
+    @is_staff()
+    @app_commands.describe(
+        message="The message to post, split in several messages past 2000 characters.",
+        channels="Channel or thread IDs (or mentions), separated by spaces.",
+        category="Post in every text channel of this category and their active threads.",
+        role="Post in every text channel this role can see and write in.",
+    )
+    @app_commands.autocomplete(channels=channels_autocomplete)
+    async def broadcast_command(
+        interaction: discord.Interaction,
+        message: str,
+        channels: str = "",
+        category: Optional[discord.CategoryChannel] = None,
+        role: Optional[discord.Role] = None,
+    ):
+        """
+        Post a message to a set of channels, reporting progress in a single ephemeral status message.
+        Arguments:
+            interaction: The interaction object.
+            message: The message to post.
+            channels, category, role: The targets, combined.
+        """
+        outbound = interaction.client.outbound
+        targets, rejected = broadcast.resolve_targets(
+            interaction.guild, channel_ids=channels, category=category, role=role
+        )
+        if not targets:
+            await outbound.respond(
+                interaction.response.send_message, "❌ Aucun salon cible où le bot peut écrire.", ephemeral=True
+            )
+            return
+        if len(targets) > broadcast.MAX_TARGETS:
+            await outbound.respond(
+                interaction.response.send_message,
+                f"❌ Trop de salons ciblés ({len(targets)}, maximum {broadcast.MAX_TARGETS}).",
+                ephemeral=True,
+            )
+            return
+
+        job = broadcast.Broadcast(outbound, targets, message)
+        await outbound.respond(
+            interaction.response.send_message, broadcast.progress_text(job.result), ephemeral=True
+        )  # The status message, edited as the broadcast goes
+
+        async def report(content: str) -> None:
+            try:
+                await outbound.respond(interaction.edit_original_response, content=content)
+            except discord.HTTPException:
+                pass  # The interaction token expires after 15 minutes, the broadcast goes on
+
+        async def run() -> None:
+            try:
+                result = await job.run(lambda result: report(broadcast.progress_text(result)))
+            except asyncio.CancelledError:  # The bot is shutting down, say where the broadcast stopped
+                await report(broadcast.summary_text(job.result, rejected, interrupted=True))
+                raise
+            await report(broadcast.summary_text(result, rejected))
+
+        # The broadcast outlives the handler: no execution timeout, the shutdown waits for it then interrupts it
+        interaction.client.lifecycle.spawn(run(), name=f"say-broadcast-{interaction.id}")
+
+    tree.add_command(group)
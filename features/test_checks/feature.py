@@ -11,6 +11,7 @@ FEATURE = {
     "author": "Thomas",
     "requires_config": False,
     "permissions": ["send_messages"],
+    "provides": ["checktest"],
 }
 
 
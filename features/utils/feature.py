@@ -1,41 +1,65 @@
 import discord
 from discord import app_commands
 
+from bot.core.settings import Setting
+
+from .index import CommandIndex, HelpPaginator
+
 FEATURE = {
     "slug": "utils",
     "name": "Utils Feature",
     "description": "A feature that provides help commands.",
-    "version": "1.0.0",
+    "version": "1.1.0",
     "author": "Tryno",
     "requires_config": True,
     "permissions": ["send_messages", "embed_links"],
+    "provides": ["utils"],
+}
+
+SETTINGS = {
+    "ephemeral_default": Setting(bool, default=True),
 }
 
 
 def register(tree: app_commands.CommandTree, config):
     group = app_commands.Group(name=FEATURE["slug"], description="Help commands")
+    # guild id -> (command revision of the bot, index), rebuilt only when the synced command tree changed
+    indexes = {}
+
+    def get_index(interaction: discord.Interaction) -> CommandIndex:
+        revision = getattr(interaction.client, "command_revision", None)
+        cached = indexes.get(interaction.guild_id)
+        if cached is None or cached[0] != revision:
+            cached = indexes[interaction.guild_id] = (
+                revision,
+                CommandIndex.build(tree, discord.Object(id=interaction.guild_id)),
+            )
+        return cached[1]
+
+    async def query_autocomplete(interaction: discord.Interaction, current: str):
+        if not interaction.guild_id:
+            return []
+        return [
+            app_commands.Choice(name=entry.line[:100], value=entry.path)
+            for entry in get_index(interaction).search(current)[:25]
+        ]
 
     @group.command(name="help", description="List all available commands")
-    async def help_commands(interaction: discord.Interaction):
-        commands_list = []
-        discord_guild = (
-            discord.utils.get(interaction.client.guilds, id=interaction.guild_id) if isinstance(config, dict) else None
-        )
-        if not discord_guild:
+    @app_commands.describe(query="Filter commands by name or description")
+    @app_commands.autocomplete(query=query_autocomplete)
+    async def help_commands(interaction: discord.Interaction, query: str = ""):
+        if not interaction.guild_id:
             await interaction.response.send_message(
                 "❌ Impossible de récupérer les commandes pour ce serveur.", ephemeral=True
             )
             return
-        for cmd in tree.get_commands(guild=discord_guild):
-            if isinstance(cmd, app_commands.Group):
-                for subcmd in cmd.commands:
-                    commands_list.append(f"/{cmd.name} {subcmd.name} - {subcmd.description}")
-            else:
-                commands_list.append(f"/{cmd.name} - {cmd.description}")
-
-        help_message = "Voici la liste des commandes disponibles :\n\n" + "\n".join(commands_list)
+        ephemeral_default = config.settings_for(interaction.guild_id).ephemeral_default
+        pages = CommandIndex.pages(get_index(interaction).search(query))
+        if len(pages) == 1:
+            await interaction.response.send_message(embed=pages[0], ephemeral=ephemeral_default)
+            return
         await interaction.response.send_message(
-            help_message, ephemeral=config.get("ephemeral_default", True) if isinstance(config, dict) else True
+            embed=pages[0], view=HelpPaginator(pages, interaction.user.id), ephemeral=ephemeral_default
         )
 
     tree.add_command(group)
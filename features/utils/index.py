@@ -0,0 +1,109 @@
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import discord
+from discord import app_commands
+
+PAGE_SIZE = 10
+
+
+@dataclass(frozen=True)
+class CommandEntry:
+    path: str  # e.g. "utils help"
+    description: str
+
+    @property
+    def line(self) -> str:
+        return f"/{self.path} - {self.description}"
+
+
+class CommandIndex:
+    """Commands of a guild sorted by name, with a sorted token list for prefix search
+
+    Every word of a command path and description is a token, so "mes" finds "/say" through "messages".
+    """
+
+    def __init__(self, entries: List[CommandEntry]) -> None:
+        self.entries = sorted(entries, key=lambda entry: entry.path)
+        tokens = set()
+        for position, entry in enumerate(self.entries):
+            for word in f"{entry.path} {entry.description}".lower().split():
+                tokens.add((word, position))
+        self._tokens: List[Tuple[str, int]] = sorted(tokens)
+
+    @classmethod
+    def build(cls, tree: app_commands.CommandTree, guild: Optional[discord.abc.Snowflake]) -> "CommandIndex":
+        entries = []
+        for cmd in tree.get_commands(guild=guild, type=discord.AppCommandType.chat_input):
+            if isinstance(cmd, app_commands.Group):
+                for subcmd in cmd.walk_commands():
+                    if isinstance(subcmd, app_commands.Command):
+                        entries.append(CommandEntry(subcmd.qualified_name, subcmd.description))
+            else:
+                entries.append(CommandEntry(cmd.name, cmd.description))
+        return cls(entries)
+
+    def _prefix(self, prefix: str) -> set:
+        start = bisect_left(self._tokens, (prefix,))
+        found = set()
+        for word, position in self._tokens[start:]:
+            if not word.startswith(prefix):
+                break
+            found.add(position)
+        return found
+
+    def search(self, query: str) -> List[CommandEntry]:
+        """entries matching every word of query as a prefix"""
+        words = query.lower().lstrip("/").split()
+        if not words:
+            return list(self.entries)
+        positions = self._prefix(words[0])
+        for word in words[1:]:
+            positions &= self._prefix(word)
+        return [self.entries[position] for position in sorted(positions)]
+
+    @staticmethod
+    def pages(entries: List[CommandEntry]) -> List[discord.Embed]:
+        chunks = [entries[i : i + PAGE_SIZE] for i in range(0, len(entries), PAGE_SIZE)] or [[]]
+        embeds = []
+        for number, chunk in enumerate(chunks, start=1):
+            embed = discord.Embed(
+                title="Commandes disponibles",
+                description="\n".join(entry.line for entry in chunk) or "Aucune commande trouvée.",
+                color=discord.Color.blurple(),
+            )
+            embed.set_footer(text=f"Page {number}/{len(chunks)}")
+            embeds.append(embed)
+        return embeds
+
+
+class HelpPaginator(discord.ui.View):
+    """previous/next buttons over pre-built embeds"""
+
+    def __init__(self, pages: List[discord.Embed], user_id: int) -> None:
+        super().__init__(timeout=120)
+        self.pages = pages
+        self.user_id = user_id
+        self.current = 0
+        self._refresh()
+
+    def _refresh(self) -> None:
+        self.previous.disabled = self.current == 0
+        self.next.disabled = self.current >= len(self.pages) - 1
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.user_id
+
+    async def _show(self, interaction: discord.Interaction, offset: int) -> None:
+        self.current = max(0, min(self.current + offset, len(self.pages) - 1))
+        self._refresh()
+        await interaction.response.edit_message(embed=self.pages[self.current], view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, -1)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, 1)
@@ -1,28 +1,74 @@
+import time
+
 import discord
 from discord import app_commands
 
 FEATURE = {
-    "slug": "version", 
-    "name": "Version Feature", 
-    "description": "A feature that provides the bot's version information.", 
-    "version": "1.0.0",
-    "author": "Tryno", 
+    "slug": "version",
+    "name": "Version Feature",
+    "description": "A feature that provides the bot's version information.",
+    "version": "1.1.0",
+    "author": "Tryno",
     "requires_config": False,
-    "permissions": ["send_messages", "embed_links"]   
+    "permissions": ["send_messages", "embed_links"],
+    "provides": ["version"],
 }
 
-def register(tree : app_commands.CommandTree, config): 
-    @tree.command(name=FEATURE["slug"], description=FEATURE["description"]) 
-    async def version_command(interaction: discord.Interaction): 
+
+def _duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    return f"{days}d {hours}h {minutes}m" if days else f"{hours}h {minutes}m {seconds}s"
+
+
+def _diagnostics_embed(snapshot) -> discord.Embed:
+    """render a bot.core.diagnostics.Snapshot, nothing is measured here"""
+    embed = discord.Embed(title="Bot Version", color=discord.Color.blue())
+    embed.add_field(
+        name="Build",
+        value=(
+            f"Commit `{snapshot.commit[:12] if snapshot.commit else 'unknown'}`\n"
+            f"discord.py {snapshot.discord_py} · Python {snapshot.python}"
+        ),
+        inline=False,
+    )
+    embed.add_field(
+        name="Runtime",
+        value=(
+            f"Uptime {_duration(snapshot.uptime)}\n"
+            f"Gateway latency {f'{snapshot.latency * 1000:.0f} ms' if snapshot.latency is not None else 'n/a'}\n"
+            f"Memory (RSS) {f'{snapshot.rss / 2**20:.1f} MiB' if snapshot.rss is not None else 'n/a'}\n"
+            f"asyncio tasks {snapshot.tasks}"
+        ),
+        inline=False,
+    )
+    embed.add_field(
+        name=f"Features ({len(snapshot.features)})",
+        value="\n".join(f"`{slug}` {version}" for slug, version in snapshot.features)[:1024] or "none",
+        inline=False,
+    )
+    embed.set_footer(text=f"Snapshot taken {time.time() - snapshot.taken_at:.0f} s ago")
+    return embed
+
+
+def register(tree : app_commands.CommandTree, config):
+    @tree.command(name=FEATURE["slug"], description=FEATURE["description"])
+    async def version_command(interaction: discord.Interaction):
         """
-        Provide the bot's version information.
+        Provide the bot's version information, from the snapshot of the diagnostics collector.
         Arguments:
             interaction: The interaction object.
         """
-        bot_version = FEATURE["version"]
-        embed = discord.Embed(
-            title="Bot Version",
-            description=f"The current bot version is {bot_version}.",
-            color=discord.Color.blue()
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
\ No newline at end of file
+        diagnostics = getattr(interaction.client, "diagnostics", None)
+        snapshot = diagnostics.snapshot if diagnostics is not None else None
+        if snapshot is not None:
+            embed = _diagnostics_embed(snapshot)
+        else:
+            bot_version = FEATURE["version"]
+            embed = discord.Embed(
+                title="Bot Version",
+                description=f"The current bot version is {bot_version}.",
+                color=discord.Color.blue()
+            )
+        await interaction.response.send_message(embed=embed, ephemeral=True)